@@ -9,11 +9,15 @@ from app.modules import CeleryAction, TaskSyncStatus
 
 logger = utils.get_logger()
 
+# 扫描过程中大量子域名、URL 共用同一主域，缓存 DNS 解析结果
+utils.install_dns_cache()
+
 celery = Celery('task', broker=Config.CELERY_BROKER_URL)
 
 celery.conf.update(
     task_acks_late=False,
     worker_prefetch_multiplier=1,
+    broker_pool_limit=Config.CELERY_BROKER_POOL_LIMIT,
     broker_transport_options={"max_retries": 3, "interval_start": 0, "interval_step": 0.2, "interval_max": 0.5},
 )
 platforms.C_FORCE_ROOT = True
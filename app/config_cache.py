@@ -0,0 +1,138 @@
+import os
+import sys
+import json
+import stat
+import hashlib
+import tempfile
+
+import yaml
+
+try:
+    # 优先使用 libyaml 实现的解析器
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
+
+def intern_config(value):
+    """
+    递归驻留配置中的字符串，重复的键和值共用同一个对象，
+    preload 模式下 fork 出的 worker 通过写时复制共享这些对象
+    """
+    if isinstance(value, str):
+        return sys.intern(value)
+
+    if isinstance(value, dict):
+        return {intern_config(k): intern_config(v) for k, v in value.items()}
+
+    if isinstance(value, list):
+        return [intern_config(x) for x in value]
+
+    return value
+
+
+def private_cache_dir():
+    """
+    获取当前用户私有的缓存目录，目录属主不是当前用户或其他用户可访问时返回 None
+    其他用户无法在该目录中创建或替换文件
+    """
+    if not hasattr(os, "geteuid"):
+        # Windows 下临时目录本身就是用户私有的
+        return tempfile.gettempdir()
+
+    cache_dir = os.path.join(tempfile.gettempdir(), "arl-config-{}".format(os.geteuid()))
+    try:
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        st = os.lstat(cache_dir)
+    except OSError:
+        return None
+
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.geteuid() or st.st_mode & 0o077:
+        return None
+
+    return cache_dir
+
+
+def get_cache_file(config_file):
+    """
+    获取配置解析结果的缓存文件路径，可以通过环境变量 ARL_CONFIG_CACHE 指定
+    没有可用的私有缓存目录时返回 None
+    """
+    cache_file = os.environ.get('ARL_CONFIG_CACHE')
+    if cache_file:
+        return cache_file
+
+    cache_dir = private_cache_dir()
+    if cache_dir is None:
+        return None
+
+    name = hashlib.md5(os.path.abspath(config_file).encode()).hexdigest()
+    return os.path.join(cache_dir, "arl_config_{}.json".format(name))
+
+
+def _read_cache(cache_file):
+    """
+    读取缓存文件，文件属主不是当前用户或其他用户可写时不使用
+    """
+    flags = os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0)
+    fd = os.open(cache_file, flags)
+    with os.fdopen(fd, encoding='utf-8') as f:
+        if hasattr(os, "geteuid"):
+            st = os.fstat(fd)
+            if st.st_uid != os.geteuid() or st.st_mode & 0o022:
+                return None
+
+        return json.load(f)
+
+
+def _write_cache(cache_file, key, data):
+    """
+    先写临时文件再替换，避免其他进程读到写了一半的缓存
+    """
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(cache_file) or None, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "config": data}, f, ensure_ascii=False)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        try:
+            os.unlink(tmp_file)
+        except OSError:
+            pass
+
+
+def load_yaml_config(config_file):
+    """
+    加载 YAML 配置文件，解析结果以 JSON 缓存到当前用户私有的目录中，
+    配置文件的路径、修改时间和大小都未变化时直接读取缓存，不再重新解析
+
+    Args:
+        config_file (str): 配置文件路径
+
+    Returns:
+        dict: 配置字典
+    """
+    st = os.stat(config_file)
+    key = [os.path.abspath(config_file), st.st_mtime_ns, st.st_size]
+    cache_file = get_cache_file(config_file)
+
+    if cache_file:
+        try:
+            item = _read_cache(cache_file)
+            if isinstance(item, dict) and item.get("key") == key:
+                return intern_config(item.get("config"))
+        except (OSError, ValueError):
+            pass
+
+    with open(config_file, encoding='utf-8') as f:
+        data = yaml.load(f, Loader=YamlLoader)
+
+    # JSON 会把非字符串的键转换为字符串，无法原样还原的配置不缓存
+    if cache_file:
+        try:
+            if json.loads(json.dumps(data)) == data:
+                _write_cache(cache_file, key, data)
+        except (TypeError, ValueError):
+            pass
+
+    return intern_config(data)
@@ -0,0 +1,17 @@
+# Gunicorn 配置钩子，由 start_web.py 通过 --config python:app.gunicorn_conf 加载
+import gc
+
+
+def when_ready(server):
+    """
+    master 准备就绪、fork worker 之前调用
+    更新检查和 --preload 导入应用时会在 master 中创建数据库连接，
+    这里关闭，worker 首次访问数据库时各自创建连接
+    """
+    from app.utils import close_conn_db
+    close_conn_db()
+
+    # --preload 导入的应用对象同样移出 GC 跟踪，worker 中的垃圾回收不再写脏这些共享页
+    if hasattr(gc, 'freeze'):
+        gc.collect()
+        gc.freeze()
@@ -1,14 +1,71 @@
+if __name__ == '__main__':
+    # 直接运行时优先使用 gevent，需在导入 requests 等模块之前打补丁
+    try:
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        monkey = None
+
 import os
-from flask import Flask, send_from_directory, send_file
+import hashlib
+from flask import Flask, Response, send_from_directory, request
 from flask_restx import Api
 
 from app import routes
-from app.utils import arl_update
+from app.utils import arl_update, install_dns_cache
 
 # 获取项目根目录和前端文件目录
 basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
 frontend_dir = os.path.join(basedir, 'docker', 'frontend')
 
+
+def _scan_frontend_files(root):
+    """
+    启动时收集前端目录下的全部文件，路径统一使用 / 分隔
+    """
+    files = set()
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            rel_path = os.path.relpath(os.path.join(dirpath, name), root)
+            files.add(rel_path.replace(os.sep, '/'))
+
+    return frozenset(files)
+
+
+FRONTEND_FILES = _scan_frontend_files(frontend_dir)
+
+
+def _load_index_html():
+    """
+    index.html 在进程生命周期内不变，启动时读入内存并计算 ETag
+    """
+    index_path = os.path.join(frontend_dir, 'index.html')
+    if not os.path.isfile(index_path):
+        return None, None
+
+    with open(index_path, 'rb') as f:
+        data = f.read()
+
+    return data, hashlib.md5(data).hexdigest()
+
+
+INDEX_HTML, INDEX_ETAG = _load_index_html()
+
+
+def index_response():
+    if INDEX_HTML is None:
+        return "File not found", 404
+
+    if request.if_none_match.contains(INDEX_ETAG):
+        resp = Response(status=304)
+    else:
+        resp = Response(INDEX_HTML, mimetype='text/html')
+
+    resp.set_etag(INDEX_ETAG)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+
 # 配置Flask应用，指定静态文件目录
 arl_app = Flask(__name__, static_folder=frontend_dir, static_url_path='')
 arl_app.config['BUNDLE_ERRORS'] = True
@@ -66,7 +123,7 @@ def index():
     """
     返回前端主页
     """
-    return send_file(os.path.join(frontend_dir, 'index.html'))
+    return index_response()
 
 # 添加错误处理器来处理404错误
 @arl_app.errorhandler(404)
@@ -83,26 +140,31 @@ def handle_404(e):
             return {"message": "API endpoint not found"}, 404
     
     # 检查请求路径
-    from flask import request
     request_path = request.path
     
     # 如果是API请求，返回JSON格式的404错误
     if request_path.startswith('/api/'):
         return {"message": "API endpoint not found"}, 404
     
-    # 检查是否是静态文件请求
-    if '.' in request_path.split('/')[-1]:
-        # 尝试从frontend目录提供静态文件
-        try:
-            return send_from_directory(frontend_dir, request_path.lstrip('/'))
-        except:
-            return "File not found", 404
+    # 前端目录中存在的文件直接返回，不再逐次访问磁盘判断
+    rel_path = request_path.lstrip('/')
+    if rel_path in FRONTEND_FILES:
+        return send_from_directory(frontend_dir, rel_path)
+
+    # 不存在的静态文件请求
+    if '.' in rel_path.rsplit('/', 1)[-1]:
+        return "File not found", 404
     
     # 对于其他所有请求（前端路由），返回index.html让Vue Router处理
-    return send_file(os.path.join(frontend_dir, 'index.html'))
+    return index_response()
 
 
+install_dns_cache()
 arl_update()
 
 if __name__ == '__main__':
-    arl_app.run(debug=True, port=5018, host="0.0.0.0")
+    if monkey is not None:
+        from gevent.pywsgi import WSGIServer
+        WSGIServer(("0.0.0.0", 5018), arl_app).serve_forever()
+    else:
+        arl_app.run(debug=True, port=5018, host="0.0.0.0", threaded=True)
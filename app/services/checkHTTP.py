@@ -1,57 +1,206 @@
 import time
+import threading
+from queue import Queue, Empty
+
+import requests
+from requests.adapters import HTTPAdapter
 
 from app import utils
+from app.config import Config
+from app.utils.conn import UA
 from .baseThread import BaseThread
 
 import requests.exceptions
 logger = utils.get_logger()
 
+REQUEST_ERRORS = requests.exceptions.RequestException
+
+# GET 回退时，响应体小于该值则读完以复用连接
+DRAIN_MAX_SIZE = 4 * 1024
+
+# 短时间内重复探测同一 URL 时直接复用结果，按 URL 哈希分片加锁
+RESULT_CACHE_TTL = 60
+_RESULT_CACHE = {}
+_RESULT_CACHE_LOCKS = [threading.Lock() for _ in range(16)]
+
+
+def _cache_lock(url):
+    return _RESULT_CACHE_LOCKS[hash(url) & 15]
+
+
+def get_cached_result(url):
+    with _cache_lock(url):
+        ts, item = _RESULT_CACHE.get(url, (0, None))
+
+    if item is not None and time.monotonic() - ts < RESULT_CACHE_TTL:
+        return item
+
+
+def set_cached_result(url, item):
+    with _cache_lock(url):
+        _RESULT_CACHE[url] = (time.monotonic(), item)
+
+
+def purge_result_cache():
+    """清理过期的探测结果"""
+    now = time.monotonic()
+    for url, (ts, _) in list(_RESULT_CACHE.items()):
+        if now - ts >= RESULT_CACHE_TTL:
+            with _cache_lock(url):
+                _RESULT_CACHE.pop(url, None)
+
 
 class CheckHTTP(BaseThread):
     def __init__(self, urls, concurrency=10):
         super().__init__(urls, concurrency=concurrency)
         self.timeout = (5, 3)
         self.checkout_map = {}
+        # 每个工作线程写入自己的结果分片，结束后统一合并
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self.session = self._build_session()
+
+    def _build_session(self):
+        """
+        构建复用连接池的 Session，避免每个 URL 都重新进行 TCP/TLS 握手
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency,
+                              pool_maxsize=self.concurrency * 2, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        session.verify = False
+        session.headers.update({
+            "User-Agent": UA,
+            # 不允许缓存
+            "Cache-Control": "max-age=0"
+        })
+
+        if Config.PROXY_URL:
+            session.proxies = {
+                "https": Config.PROXY_URL,
+                "http": Config.PROXY_URL
+            }
+
+        return session
+
+    @staticmethod
+    def _drain_small_body(conn):
+        """
+        未读完响应体的连接在关闭时会被直接断开，无法归还连接池
+        响应体很小时直接读完，让连接可以被后续请求复用
+        """
+        try:
+            length = int(conn.headers.get("Content-Length", -1))
+        except ValueError:
+            return
+
+        if 0 <= length <= DRAIN_MAX_SIZE:
+            conn.content
 
     def check(self, url):
         """
         检查网站是否存活
         只要能获得HTTP响应就认为存活，不过度过滤状态码
         """
-        conn = utils.http_req(url, method="get", timeout=self.timeout, stream=True)
-        conn.close()
+        # 只需要状态码和 Content-Type，优先使用 HEAD 请求
+        with self.session.head(url, timeout=self.timeout, allow_redirects=False) as conn:
+            status_code = conn.status_code
+            content_type = conn.headers.get("Content-Type", "")
+
+        # 不支持 HEAD 方法的服务，回退到 GET，stream 模式下只读取响应头
+        if status_code in [405, 501]:
+            with self.session.get(url, timeout=self.timeout, stream=True, allow_redirects=False) as conn:
+                status_code = conn.status_code
+                content_type = conn.headers.get("Content-Type", "")
+                if status_code not in [502, 504]:
+                    self._drain_small_body(conn)
 
         # 只过滤明确的网络错误状态码，保留大部分响应
         # 502, 504: 网关错误，通常表示后端服务不可用
         # 这些状态码通常表示网络层面的问题，而非应用层响应
-        if conn.status_code in [502, 504]:
+        if status_code in [502, 504]:
             return None
 
         # 构建返回信息
         item = {
-            "status": conn.status_code,
-            "content-type": conn.headers.get("Content-Type", "")
+            "status": status_code,
+            "content-type": content_type
         }
 
         return item
 
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+
+        return shard
+
     def work(self, url):
+        cached = get_cached_result(url)
+        if cached is not None:
+            self._shard()[url] = cached
+            return
+
         try:
             out = self.check(url)
             if out is not None:
-                self.checkout_map[url] = out
+                self._shard()[url] = out
+                set_cached_result(url, out)
 
-        except requests.exceptions.RequestException as e:
+        except REQUEST_ERRORS:
             pass
 
         except Exception as e:
-            logger.warning("error on url {}".format(url))
-            logger.warning(e)
+            logger.warning("error on url %s: %r", url, e)
+
+    def _consume(self, queue):
+        while True:
+            try:
+                url = queue.get_nowait()
+            except Empty:
+                return
+
+            self.work(url)
+
+    def _run(self):
+        """
+        使用固定数量的工作线程消费 URL 队列，避免每个 URL 创建一个线程
+        """
+        queue = Queue()
+        for target in self.targets:
+            target = target.strip()
+            if target:
+                queue.put(target)
+
+        workers = []
+        for _ in range(min(self.concurrency, queue.qsize())):
+            t = threading.Thread(target=self._consume, args=(queue,), daemon=True)
+            t.start()
+            workers.append(t)
+
+        for t in workers:
+            t.join()
+
+    def close(self):
+        self.session.close()
 
     def run(self):
         t1 = time.time()
         logger.info("start check http {}".format(len(self.targets)))
-        self._run()
+        try:
+            self._run()
+        finally:
+            self.close()
+            purge_result_cache()
+
+        for shard in self._shards:
+            self.checkout_map.update(shard)
         elapse = time.time() - t1
         return self.checkout_map
 
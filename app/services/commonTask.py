@@ -6,6 +6,7 @@ from app import services
 from app.config import Config
 from app.modules import CollectSource, WebSiteFetchStatus, WebSiteFetchOption
 from app.services.nuclei_scan import nuclei_scan
+from app.services.webAnalyze import IN_PROCESS_ANALYZE
 from app.services import run_risk_cruising, BaseUpdateTask
 logger = utils.get_logger()
 
@@ -91,6 +92,7 @@ class WebSiteFetch(object):
         self.site_info_list = []  # *** 这个是来自 services.fetch_site 的结果
         self.available_sites = []  # *** 这个是存活的站点
         self.web_analyze_map = dict()
+        self.page_map = None  # 站点 => (响应头, 页面内容)，仅在进程内站点识别时保存
         self.wih_domain_set = set()  # 用于保存来自wih的域名，已添加的域名不再添加
         self.wih_record_set = set()  # 用于保存来自wih的记录，已添加的记录不再添加
 
@@ -113,7 +115,7 @@ class WebSiteFetch(object):
 
     def site_identify(self):
         # ** 调用指纹识别
-        self.web_analyze_map = services.web_analyze(self.available_sites)
+        self.web_analyze_map = services.web_analyze(self.available_sites, page_map=self.page_map)
 
     def __str__(self):
         return "<WebSiteFetch> task_id:{}, sites: {}, available_sites:{}".format(
@@ -187,7 +189,10 @@ class WebSiteFetch(object):
 
     def fetch_site(self):
         # ***站点信息获取***
-        self.site_info_list = services.fetch_site(self.sites)
+        if self.options.get(WebSiteFetchOption.SITE_IDENTIFY) and IN_PROCESS_ANALYZE:
+            self.page_map = {}
+
+        self.site_info_list = services.fetch_site(self.sites, page_map=self.page_map)
         for site_info in self.site_info_list:
             curr_site = site_info["site"]
             self.available_sites.append(curr_site)
@@ -312,6 +317,7 @@ class WebSiteFetch(object):
 
         # 清空，节省内存
         self.site_info_list = []
+        self.page_map = None
 
         """ *** 站点截图 """
         if self.options.get(WebSiteFetchOption.SITE_CAPTURE):
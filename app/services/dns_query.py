@@ -22,7 +22,7 @@ class DNSQueryBase(object):
         """
         根据子域名查询
         :param target:
-        :return:
+        :return: 域名的 list 或 frozenset 等不可变集合，调用方不应修改返回值
         """
         raise NotImplementedError()
 
@@ -35,7 +35,7 @@ class DNSQueryBase(object):
             self.logger.error("{} error: {}".format(self.source_name, e))
             return []
 
-        if not isinstance(domains, list):
+        if not isinstance(domains, (list, tuple, set, frozenset)):
             self.logger.warning("{} is not list".format(domains))
             return []
 
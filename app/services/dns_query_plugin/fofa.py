@@ -1,6 +1,10 @@
+import re
 from app.services.dns_query import DNSQueryBase
 from app.utils import get_fld
-from app.services.fofaClient import fofa_query
+from app.services.fofaClient import fofa_query_iter
+
+# 从 fofa 返回的 host 字段中提取主机名，如 https://www.example.com:8443/
+_HOST_RE = re.compile(r'^(?:[a-zA-Z][a-zA-Z0-9+\-.]*://)?([^/:\s]+)')
 
 
 class Query(DNSQueryBase):
@@ -8,37 +12,30 @@ class Query(DNSQueryBase):
         super(Query, self).__init__()
         self.source_name = "fofa"
 
-    def sub_domains(self, target):
-        query = 'domain="{}"'.format(target)
-
+    def build_query(self, target):
+        # get_fld 带缓存，任务中的 target 已统一为小写，同一主域可直接命中
         domain = get_fld(target)
 
         # Target 是非法域名
         if not domain:
             self.logger.warning("Invalid domain: {}".format(target))
-            return []
+            return None
 
         # 表示是子域名，需要用host 和 domain 一起查询
         if domain != target:
-            query = 'host="{}" && domain="{}"'.format(target, domain)
-
-        self.logger.debug("target:{}, fofa query: {}".format(target, query))
-
-        data = fofa_query(query, 9999)
-        results = []
-        if isinstance(data, dict):
-            if data['error']:
-                raise Exception(data['error'])
+            return 'host="{}" && domain="{}"'.format(target, domain)
 
-            for item in data["results"]:
-                domain_data = item[0]
-                if "://" in domain_data:
-                    domain_data = domain_data.split(":")[1].strip("/")
+        return 'domain="{}"'.format(target)
 
-                results.append(domain_data.split(":")[0])
+    def fetch_hosts(self, query):
+        matches = map(_HOST_RE.match, (item[0] for item in fofa_query_iter(query, 9999)))
+        return {m.group(1) for m in matches if m}
 
-        else:
-            raise Exception(data)
+    def sub_domains(self, target):
+        query = self.build_query(target)
+        if query is None:
+            return frozenset()
 
-        return list(set(results))
+        self.logger.debug("target:{}, fofa query: {}".format(target, query))
 
+        return frozenset(self.fetch_hosts(query))
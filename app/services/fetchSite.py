@@ -12,11 +12,15 @@ from .autoTag import auto_tag
 from app.utils import http_req, normal_url
 from app.utils.fingerprint import load_fingerprint, fetch_fingerprint
 
+# 保留给站点识别使用的页面内容最大长度
+PAGE_MAX_SIZE = 256 * 1024
+
 
 class FetchSite(BaseThread):
-    def __init__(self, sites, concurrency=6, http_timeout=None):
+    def __init__(self, sites, concurrency=6, http_timeout=None, page_map=None):
         super().__init__(sites, concurrency)
         self.site_info_list = []
+        self.page_map = page_map
         self.fingerprint_list = load_fingerprint()
         self.http_timeout = http_timeout
         if http_timeout is None:
@@ -84,6 +88,11 @@ class FetchSite(BaseThread):
                 or (conn.status_code != 301 and conn.status_code != 302):
             self.site_info_list.append(item)
 
+            # 保留响应头和页面内容，站点识别时不再重复请求
+            if self.page_map is not None:
+                body = conn.content[:PAGE_MAX_SIZE].decode("utf-8", errors="replace")
+                self.page_map[item["site"]] = (dict(conn.headers), body)
+
         if conn.status_code == 301 or conn.status_code == 302:
             url_302 = urljoin(site, conn.headers.get("Location", ""))
             url_302 = normal_url(url_302)
@@ -143,12 +152,12 @@ def fetch_favicon(url):
     return f.run()
 
 
-def fetch_site(sites, concurrency=15, http_timeout=None):
+def fetch_site(sites, concurrency=15, http_timeout=None, page_map=None):
     # 更新数据库缓存
     from app.services import finger_db_cache
     finger_db_cache.update_cache()
 
-    f = FetchSite(sites, concurrency=concurrency, http_timeout=http_timeout)
+    f = FetchSite(sites, concurrency=concurrency, http_timeout=http_timeout, page_map=page_map)
     return f.run()
 
 
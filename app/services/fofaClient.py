@@ -1,10 +1,55 @@
 #  -*- coding:UTF-8 -*-
+import atexit
 import base64
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from app.config import Config
-from app import utils
+from app.utils.conn import UA
 from celery.utils.log import get_task_logger
 logger = get_task_logger(__name__)
 
+# 账号会员等级缓存，避免每次查询前都多请求一次 info/my
+VIP_LEVEL_CACHE_TTL = 10 * 60
+_vip_level_cache = {}
+
+# 每个线程复用一个 Session，保持到 fofa 的长连接
+_tls = threading.local()
+_sessions = []
+_sessions_lock = threading.Lock()
+
+
+def _session():
+    session = getattr(_tls, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_maxsize=64, max_retries=Retry(total=2, backoff_factor=0.2))
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.verify = False
+        session.headers.update({"User-Agent": UA, "Connection": "keep-alive"})
+        if Config.PROXY_URL:
+            session.proxies = {
+                "https": Config.PROXY_URL,
+                "http": Config.PROXY_URL
+            }
+
+        _tls.session = session
+        with _sessions_lock:
+            _sessions.append(session)
+
+    return session
+
+
+@atexit.register
+def _close_sessions():
+    with _sessions_lock:
+        for session in _sessions:
+            session.close()
+        _sessions.clear()
+
 
 class FofaClient:
     def __init__(self, email, key, page_size=9999):
@@ -25,13 +70,14 @@ class FofaClient:
         data = self._api(self.base_url + self.info_my_api_url)
         return data
 
-    def fofa_search_all(self, query):
+    def fofa_search_all(self, query, page=1):
         qbase64 = base64.b64encode(query.encode())
         param = {
             "email": self.email,
             "key": self.key,
             "qbase64": qbase64.decode('utf-8'),
-            "size": self.page_size
+            "size": self.page_size,
+            "page": page
         }
 
         self.param = param
@@ -39,7 +85,7 @@ class FofaClient:
         return data
 
     def _api(self, url):
-        data = utils.http_req(url, 'get', params=self.param).json()
+        data = _session().get(url, params=self.param, timeout=30).json()
         if data.get("error") and data["errmsg"]:
             raise Exception(data["errmsg"])
 
@@ -52,6 +98,17 @@ class FofaClient:
         return results
 
 
+def get_vip_level(client):
+    key = (client.email, client.key)
+    item = _vip_level_cache.get(key)
+    if item is not None and time.time() - item[0] < VIP_LEVEL_CACHE_TTL:
+        return item[1]
+
+    vip_level = client.info_my().get("vip_level")
+    _vip_level_cache[key] = (time.time(), vip_level)
+    return vip_level
+
+
 def fetch_ip_bycert(cert, size=9999):
     ip_set = set()
     logger.info("fetch_ip_bycert {}".format(cert))
@@ -72,21 +129,61 @@ def fofa_query(query, page_size=9999):
             return "please set fofa key in config-docker.yaml"
 
         client = FofaClient(Config.FOFA_EMAIL, Config.FOFA_KEY, page_size=page_size)
-        info = client.info_my()
-        if info.get("vip_level") == 0:
+        vip_level = get_vip_level(client)
+        if vip_level == 0:
             return "不支持注册用户"
 
         # 普通会员，最多只查100条
-        if info.get("vip_level") == 1:
+        if vip_level == 1:
             client.page_size = min(page_size, 100)
 
         data = client.fofa_search_all(query)
         return data
 
     except Exception as e:
-        error_msg = str(e)
-        error_msg = error_msg.replace(Config.FOFA_KEY[10:], "***")
-        return error_msg
+        return _mask_key(str(e))
+
+
+def _mask_key(error_msg):
+    return error_msg.replace(Config.FOFA_KEY[10:], "***")
+
+
+def fofa_query_iter(query, max_n=9999, page_size=None):
+    """
+    逐页获取 fofa 查询结果，出错时抛出异常
+    page_size 默认与 max_n 相同，一次请求取完，不额外消耗 API 调用次数；
+    需要限制单页内存占用时可以指定更小的 page_size，代价是更多次请求
+    """
+    if not Config.FOFA_KEY:
+        raise Exception("please set fofa key in config-docker.yaml")
+
+    try:
+        client = FofaClient(Config.FOFA_EMAIL, Config.FOFA_KEY, page_size=min(page_size or max_n, max_n))
+        vip_level = get_vip_level(client)
+        if vip_level == 0:
+            raise Exception("不支持注册用户")
+
+        # 普通会员，最多只查100条
+        if vip_level == 1:
+            max_n = min(max_n, 100)
+            client.page_size = min(client.page_size, max_n)
+
+        page = 1
+        count = 0
+        while count < max_n:
+            data = client.fofa_search_all(query, page=page)
+            results = data.get("results", [])
+            for item in results[:max_n - count]:
+                yield item
+
+            count += len(results)
+            if len(results) < client.page_size:
+                break
+
+            page += 1
+
+    except Exception as e:
+        raise Exception(_mask_key(str(e)))
 
 
 def fofa_query_result(query, page_size=9999):
@@ -1,13 +1,108 @@
 import os
 import json
+import asyncio
+import logging
 import subprocess
 import tempfile
 import re
+import sys
+import traceback
+import functools
+import contextlib
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from app import utils
 from app.config import Config
 
+try:
+    # orjson 直接解析 bytes，比标准库快数倍
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    # ijson 增量解析结果文件，内存占用与文件大小无关
+    import ijson
+except ImportError:
+    ijson = None
+
 logger = utils.get_logger()
 
+# 匹配端口字符串中的单个端口或端口范围，如 80 或 8080-8090
+PORT_RANGE_RE = re.compile(r'(\d+)(?:-(\d+))?')
+
+# 匹配控制台输出中的开放端口行，如 192.168.1.100:80 [HTTP]
+CONSOLE_PORT_RE = re.compile(r'^[ \t]*(\S+):([0-9]+)[ \t]*\[([^\]\n]*)\]', re.M)
+
+
+@functools.lru_cache(maxsize=1)
+def resolve_miniscan_path():
+    """
+    查找miniscan-port工具的路径，结果在进程内缓存，避免每次创建扫描器都访问磁盘
+    
+    Returns:
+        str: miniscan-port工具的完整路径
+    """
+    # 获取当前脚本所在目录的tools文件夹
+    current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    tools_dir = os.path.join(current_dir, 'tools')
+    
+    # 优先查找重命名后的文件 miniscan-port
+    miniscan_exe = os.path.join(tools_dir, 'miniscan-port')
+    
+    if os.path.exists(miniscan_exe):
+        return miniscan_exe
+    
+    # 如果找不到，尝试查找原始文件名
+    if os.name == 'nt':  # Windows
+        miniscan_exe = os.path.join(tools_dir, 'miniscan-port.exe')
+    else:  # Linux/Unix
+        miniscan_exe = os.path.join(tools_dir, 'miniscan-port-ubuntu-amd64')
+    
+    if os.path.exists(miniscan_exe):
+        return miniscan_exe
+    
+    # 最后尝试在miniscan-port子目录中查找
+    if os.name == 'nt':
+        miniscan_exe = os.path.join(tools_dir, 'miniscan-port', 'miniscan-port.exe')
+    else:
+        miniscan_exe = os.path.join(tools_dir, 'miniscan-port', 'miniscan-port-ubuntu-amd64')
+    
+    return miniscan_exe
+
+
+@functools.lru_cache(maxsize=128)
+def count_ports(ports_str):
+    """
+    计算端口字符串中包含的端口数量
+    
+    Args:
+        ports_str: 端口字符串
+        
+    Returns:
+        int: 端口数量
+    """
+    if not ports_str:
+        return 0
+        
+    return sum(int(end) - int(start) + 1 if end else 1
+               for start, end in PORT_RANGE_RE.findall(ports_str))
+
+
+@functools.lru_cache(maxsize=1024)
+def intern_service_name(name):
+    """
+    服务名取值有限，统一小写并驻留，所有端口共享同一个字符串对象
+    
+    Args:
+        name: 原始服务名
+        
+    Returns:
+        str: 小写后的服务名
+    """
+    return sys.intern(name.lower())
+
 
 class MiniscanPortScan:
     """
@@ -40,6 +135,13 @@ class MiniscanPortScan:
         self.timeout = custom_host_timeout or 1  # miniscan-port默认3秒超时
         self.port_scan_type = port_scan_type  # 新增：端口扫描类型
         
+        self._scan_mode_cache = {}
+        self._port_args_cache = None
+        
+        # 扫描模式和端口数量只计算一次，供超时估算复用
+        self._mode = self._determine_scan_mode(self.ports) if self.ports else "top1000"
+        self._port_count = self._estimate_port_count()
+        
         # 获取miniscan-port工具路径
         self.miniscan_path = self._get_miniscan_path()
         
@@ -50,32 +152,7 @@ class MiniscanPortScan:
         Returns:
             str: miniscan-port工具的完整路径
         """
-        # 获取当前脚本所在目录的tools文件夹
-        current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        tools_dir = os.path.join(current_dir, 'tools')
-        
-        # 优先查找重命名后的文件 miniscan-port
-        miniscan_exe = os.path.join(tools_dir, 'miniscan-port')
-        
-        if os.path.exists(miniscan_exe):
-            return miniscan_exe
-        
-        # 如果找不到，尝试查找原始文件名
-        if os.name == 'nt':  # Windows
-            miniscan_exe = os.path.join(tools_dir, 'miniscan-port.exe')
-        else:  # Linux/Unix
-            miniscan_exe = os.path.join(tools_dir, 'miniscan-port-ubuntu-amd64')
-        
-        if os.path.exists(miniscan_exe):
-            return miniscan_exe
-        
-        # 最后尝试在miniscan-port子目录中查找
-        if os.name == 'nt':
-            miniscan_exe = os.path.join(tools_dir, 'miniscan-port', 'miniscan-port.exe')
-        else:
-            miniscan_exe = os.path.join(tools_dir, 'miniscan-port', 'miniscan-port-ubuntu-amd64')
-        
-        return miniscan_exe
+        return resolve_miniscan_path()
     
     def _convert_ports_format(self, ports_str):
         """
@@ -103,6 +180,12 @@ class MiniscanPortScan:
         Returns:
             str: 扫描模式 (top100, top1000, all, custom)
         """
+        key = ports_str or ''
+        if key not in self._scan_mode_cache:
+            self._scan_mode_cache[key] = self._resolve_scan_mode(ports_str)
+        return self._scan_mode_cache[key]
+    
+    def _resolve_scan_mode(self, ports_str):
         # 若显式提供了端口字符串，则优先按端口字符串决定
         if ports_str:
             normalized = ports_str.strip().lower()
@@ -133,17 +216,56 @@ class MiniscanPortScan:
         Returns:
             int: 端口数量
         """
-        if not ports_str:
-            return 0
-            
-        count = 0
-        for part in ports_str.split(','):
-            if '-' in part:
-                start, end = part.split('-')
-                count += int(end) - int(start) + 1
+        return count_ports(ports_str)
+    
+    def _estimate_port_count(self):
+        """
+        估算本次扫描的端口数量
+        
+        Returns:
+            int: 端口数量
+        """
+        if self._mode == "custom":
+            return self._count_ports(self.ports)
+        
+        return {"top100": 100, "top1000": 1000, "all": 65535}.get(self._mode, 1000)
+    
+    def _port_args(self):
+        """
+        端口相关参数，同一个扫描器内只计算一次
+        
+        Returns:
+            list: -p 自定义端口或 -m 扫描模式参数
+        """
+        if self._port_args_cache is None:
+            if self.ports:
+                logger.debug("扫描模式: %s, 端口: %s", self._mode, self.ports)
+                if self._mode == "custom":
+                    self._port_args_cache = ['-p', self._convert_ports_format(self.ports)]
+                else:
+                    self._port_args_cache = ['-m', self._mode]
             else:
-                count += 1
-        return count
+                logger.debug("使用默认扫描模式: top1000")
+                self._port_args_cache = ['-m', 'top1000']  # 默认扫描模式
+        
+        return self._port_args_cache
+    
+    def _build_cmd(self, target_arg, result_file, parallelism):
+        """
+        构建miniscan-port命令
+        
+        Args:
+            target_arg: 目标或目标文件路径
+            result_file: -o 输出文件路径
+            parallelism: 线程数
+            
+        Returns:
+            list: 命令参数列表
+        """
+        output_format = '-jsonl' if Config.PORT_SCAN_JSONL else '-json'
+        return [self.miniscan_path, '-t', target_arg, '-o', result_file, output_format,
+                *self._port_args(),
+                '-T', str(parallelism), '--timeout', str(self.timeout)]
     
     def run(self):
         """
@@ -152,8 +274,62 @@ class MiniscanPortScan:
         Returns:
             list: 扫描结果列表，格式与原nmap兼容
         """
-        # 始终一次性批量扫描所有目标
-        return self._scan_batch_targets()
+        # 默认一次性批量扫描所有目标
+        return self._scan_targets_in_batches()
+    
+    @contextlib.contextmanager
+    def _temp_file(self, suffix, data=None):
+        """
+        创建临时文件并返回路径，退出上下文时自动删除
+        Windows 下打开中的 NamedTemporaryFile 不能被子进程访问，改用 mkstemp 手动清理
+        
+        Args:
+            suffix: 文件后缀
+            data: 写入的初始内容（bytes）
+        """
+        if os.name != 'nt':
+            with tempfile.NamedTemporaryFile('wb', suffix=suffix) as f:
+                if data:
+                    f.write(data)
+                    f.flush()
+                yield f.name
+            return
+        
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        try:
+            if data:
+                os.write(fd, data)
+            os.close(fd)
+            yield path
+        finally:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+    
+    def _resolve_result_file(self, result_file):
+        """
+        获取实际写入了结果的文件路径
+        subprocess.run 返回时子进程已退出，结果已写入磁盘，无需轮询等待
+        
+        Args:
+            result_file: 传给 -o 参数的结果文件路径
+            
+        Returns:
+            str: 结果文件路径，没有结果时返回None
+        """
+        try:
+            if os.stat(result_file).st_size > 0:
+                return result_file
+        except FileNotFoundError:
+            pass
+        
+        # 兼容老逻辑：尝试 result_file + '.json'
+        if os.path.exists(result_file + '.json'):
+            logger.warning("JSON结果文件未找到，使用兼容路径: %s", result_file + '.json')
+            return result_file + '.json'
+        
+        return None
     
     def _scan_batch_targets(self):
         """
@@ -162,207 +338,220 @@ class MiniscanPortScan:
         Returns:
             list: 扫描结果列表
         """
-        ip_info_list = []
+        logger.info("开始批量扫描 %s 个目标", len(self.targets))
         
-        # 创建临时文件存储目标列表和结果
-        temp_target_file = None
-        temp_result_file = None
+        # 目标一次性拼接后单次写入，每行一个
+        targets_data = ('\n'.join(self.targets) + '\n').encode('ascii', 'ignore')
         try:
-            logger.info(f"开始批量扫描 {len(self.targets)} 个目标")
-            
-            # 创建临时目标文件
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f:
-                temp_target_file = f.name
-                # 将目标写入临时文件，每行一个
-                for target in self.targets:
-                    f.write(f"{target}\n")
-            
-            # 创建临时结果文件
-            temp_result_file = tempfile.mktemp(suffix='.json')
-            
-            logger.debug(f"目标文件已创建: {temp_target_file}")
-            logger.debug(f"结果文件路径: {temp_result_file}")
-            
-            # 构建miniscan-port命令
-            cmd = [self.miniscan_path]
-            
-            # 使用-t参数指定目标文件
-            cmd.extend(['-t', temp_target_file])
-            
-            # 使用-o参数指定输出文件
-            cmd.extend(['-o', temp_result_file])
-            
-            # 添加-json参数以JSON格式输出
-            cmd.extend(['-json'])
-            
-            # 添加端口参数
-            if self.ports:
-                scan_mode = self._determine_scan_mode(self.ports)
-                logger.debug(f"扫描模式: {scan_mode}, 端口: {self.ports}")
-                if scan_mode == "custom":
-                    cmd.extend(['-p', self._convert_ports_format(self.ports)])
-                else:
-                    cmd.extend(['-m', scan_mode])
-            else:
-                cmd.extend(['-m', 'top1000'])  # 默认扫描模式
-                logger.debug("使用默认扫描模式: top1000")
-            
-            # 添加线程数 - 增加并发数以提高速度
-            parallelism = min(self.parallelism, 100)
-            cmd.extend(['-T', str(parallelism)])
-            
-            # 添加超时时间 - 使用用户指定的超时时间
-            timeout = self.timeout
-            cmd.extend(['--timeout', str(timeout)])
-            
-            logger.info(f"执行命令: {' '.join(cmd)}")
-            logger.info(f"扫描参数 - 并发数: {parallelism}, 超时: {timeout}秒")
-            
-            # 执行扫描
-            # 原超时时间: len(self.targets) * 60
-            # 基于端口数、并发与每端口超时动态估算总超时时间
-            if self.ports:
-                _mode = self._determine_scan_mode(self.ports)
-                if _mode == "custom":
-                    _port_count = self._count_ports(self.ports)
-                elif _mode == "top100":
-                    _port_count = 100
-                elif _mode == "top1000":
-                    _port_count = 1000
-                elif _mode == "all":
-                    _port_count = 65535
-                else:
-                    _port_count = 1000
-            else:
-                _port_count = 1000
-            timeout_seconds = max(60, min(1800, int((_port_count * len(self.targets)) / max(1, parallelism) * (self.timeout + 2))))
-            logger.debug(f"设置总超时时间(估算): {timeout_seconds}秒 (targets={len(self.targets)}, ports={_port_count}, T={parallelism}, perPortTimeout={self.timeout})")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_seconds)
-            
-            logger.debug(f"miniscan-port返回码: {result.returncode}")
-            logger.debug(f"stdout长度: {len(result.stdout) if result.stdout else 0}")
-            logger.debug(f"stderr长度: {len(result.stderr) if result.stderr else 0}")
-            
-            if result.returncode != 0:
-                logger.error(f"miniscan-port批量扫描失败，返回码: {result.returncode}")
-                logger.error(f"错误输出: {result.stderr}")
-                # 如果批量扫描失败，回退到单个扫描
-                logger.info("回退到单个目标扫描模式")
-                return self._scan_targets_individually()
-            
-            # 检查JSON结果文件是否存在
-            json_result_file = temp_result_file
-            # 等待文件生成，最多 3 秒
-            if not os.path.exists(json_result_file):
-                import time
-                for _ in range(30):
-                    if os.path.exists(json_result_file):
-                        break
-                    time.sleep(0.1)
-            # 兼容老逻辑：如果仍不存在，尝试 temp_result_file + '.json'
-            if not os.path.exists(json_result_file) and os.path.exists(temp_result_file + '.json'):
-                logger.warning(f"JSON结果文件未找到，使用兼容路径: {temp_result_file + '.json'}")
-                json_result_file = temp_result_file + '.json'
-            if not os.path.exists(json_result_file):
-                logger.warning(f"JSON结果文件不存在: {json_result_file}")
-                logger.info("回退到单个目标扫描模式")
-                return self._scan_targets_individually()
-            
-            logger.info(f"批量扫描完成，开始解析JSON文件: {json_result_file}")
-            
-            # 从JSON文件读取结果
-            parsed_results = self._parse_json_file(json_result_file)
-            logger.info(f"解析完成，获得 {len(parsed_results)} 个结果")
-            
-            return parsed_results
+            # 临时目标文件和结果文件在退出时自动删除
+            with self._temp_file('.txt', targets_data) as temp_target_file, \
+                    self._temp_file('.json') as temp_result_file:
+                parsed_results = self._run_batch_scan(temp_target_file, temp_result_file)
             
-        except subprocess.TimeoutExpired:
-            logger.error(f"批量扫描超时（{timeout_seconds}秒），回退到单个扫描")
+        except subprocess.TimeoutExpired as e:
+            logger.error("批量扫描超时（%s秒），回退到单个扫描", e.timeout)
             return self._scan_targets_individually()
         except Exception as e:
-            logger.error(f"批量扫描时发生错误: {str(e)}，回退到单个扫描")
-            import traceback
-            logger.debug(f"详细错误信息: {traceback.format_exc()}")
+            logger.error("批量扫描时发生错误: %s，回退到单个扫描", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("详细错误信息: %s", traceback.format_exc())
             return self._scan_targets_individually()
-        finally:
-            # 清理临时文件
-            if temp_target_file and os.path.exists(temp_target_file):
-                try:
-                    os.unlink(temp_target_file)
-                    logger.debug(f"临时目标文件已清理: {temp_target_file}")
-                except Exception as e:
-                    logger.warning(f"清理临时目标文件失败: {e}")
-            
-            if temp_result_file:
-                # 仅清理实际生成的结果文件
-                if os.path.exists(temp_result_file):
-                    try:
-                        os.unlink(temp_result_file)
-                        logger.debug(f"临时结果文件已清理: {temp_result_file}")
-                    except Exception as e:
-                        logger.warning(f"清理临时结果文件失败: {e}")
-            
-            # 已改为仅清理实际生成的结果文件，避免误拼接'.json'
-            # 此处无需再次清理
+        
+        if parsed_results is None:
+            logger.info("回退到单个目标扫描模式")
+            return self._scan_targets_individually()
+        
+        return parsed_results
+    
+    def _run_batch_scan(self, temp_target_file, temp_result_file):
+        """
+        执行批量扫描并解析结果
+        
+        Returns:
+            list: 扫描结果列表，需要回退到单个扫描时返回None
+        """
+        logger.debug("目标文件已创建: %s", temp_target_file)
+        logger.debug("结果文件路径: %s", temp_result_file)
+        
+        # 构建miniscan-port命令，-t 参数指定目标文件
+        # 增加并发数以提高速度，超时时间使用用户指定的值
+        parallelism = min(self.parallelism, 100)
+        timeout = self.timeout
+        cmd = self._build_cmd(temp_target_file, temp_result_file, parallelism)
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("执行命令: %s", ' '.join(cmd))
+        logger.info("扫描参数 - 并发数: %s, 超时: %s秒", parallelism, timeout)
+        
+        # 执行扫描
+        # 原超时时间: len(self.targets) * 60
+        # 基于端口数、并发与每端口超时动态估算总超时时间
+        _port_count = self._port_count
+        timeout_seconds = max(60, min(1800, int((_port_count * len(self.targets)) / max(1, parallelism) * (self.timeout + 2))))
+        logger.debug("设置总超时时间(估算): %s秒 (targets=%s, ports=%s, T=%s, perPortTimeout=%s)", timeout_seconds, len(self.targets), _port_count, parallelism, self.timeout)
+        # 结果写入 -o 指定的文件，stdout 只有进度信息，直接丢弃
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout_seconds)
+        
+        logger.debug("miniscan-port返回码: %s", result.returncode)
+        logger.debug("stderr长度: %s", len(result.stderr) if result.stderr else 0)
+        
+        if result.returncode != 0:
+            logger.error("miniscan-port批量扫描失败，返回码: %s", result.returncode)
+            logger.error("错误输出: %s", result.stderr.decode('utf-8', 'ignore'))
+            # 如果批量扫描失败，回退到单个扫描
+            return None
+        
+        # 检查JSON结果文件是否存在
+        json_result_file = self._resolve_result_file(temp_result_file)
+        if not json_result_file:
+            logger.warning("JSON结果文件不存在: %s", temp_result_file)
+            return None
+        
+        logger.info("批量扫描完成，开始解析JSON文件: %s", json_result_file)
+        
+        # 从JSON文件读取结果
+        parsed_results = self._parse_json_file(json_result_file)
+        logger.info("解析完成，获得 %s 个结果", len(parsed_results))
+        
+        return parsed_results
     
     def _scan_targets_in_batches(self):
         """
         分批扫描大量目标
+        miniscan-port 没有常驻服务模式，但目标文件不限行数且自带 -T 并发，
+        默认所有批次合并为一次调用，避免每批都重新启动进程；
+        配置了 PORT_SCAN_MAX_TARGETS_PER_CHILD 时按该数量拆分，各子进程并发执行
         
         Returns:
             list: 扫描结果列表
         """
-        ip_info_list = []
-        batch_size = 5  # 每批扫描5个目标
+        batch_size = Config.PORT_SCAN_MAX_TARGETS_PER_CHILD
+        if not batch_size or len(self.targets) <= batch_size:
+            return self._scan_batch_targets()
         
-        for i in range(0, len(self.targets), batch_size):
-            batch_targets = self.targets[i:i + batch_size]
-            
-            # 创建临时扫描器处理这一批
-            batch_scanner = MiniscanPortScan(
-                targets=batch_targets,
-                ports=self.ports,
-                service_detect=self.service_detect,
-                os_detect=self.os_detect,
-                port_parallelism=self.parallelism,
-                custom_host_timeout=self.timeout
-            )
-            
-            batch_results = batch_scanner._scan_batch_targets()
-            if batch_results:
-                ip_info_list.extend(batch_results)
+        batches = [self.targets[i:i + batch_size] for i in range(0, len(self.targets), batch_size)]
+        logger.info("目标拆分为 %s 批，每批最多 %s 个目标", len(batches), batch_size)
+        
+        ip_info_list = []
+        with ThreadPoolExecutor(max_workers=min(len(batches), os.cpu_count() or 4)) as executor:
+            for batch_results in executor.map(self._scan_child_batch, batches):
+                if batch_results:
+                    ip_info_list.extend(batch_results)
         
         return ip_info_list
     
+    def _scan_child_batch(self, batch_targets):
+        # 创建临时扫描器处理这一批
+        batch_scanner = MiniscanPortScan(
+            targets=batch_targets,
+            ports=self.ports,
+            service_detect=self.service_detect,
+            os_detect=self.os_detect,
+            port_parallelism=self.parallelism,
+            custom_host_timeout=self.timeout,
+            port_scan_type=self.port_scan_type
+        )
+        
+        return batch_scanner._scan_batch_targets()
+    
     def _scan_targets_individually(self):
         """
         逐个扫描目标（回退方案）
+        各目标扫描互不依赖，并发执行子进程，总耗时取决于最慢的目标
         
         Returns:
             list: 扫描结果列表
         """
-        ip_info_list = []
+        if not self.targets:
+            return []
         
-        logger.info(f"开始逐个扫描 {len(self.targets)} 个目标")
+        workers = min(len(self.targets), max(4, (os.cpu_count() or 4) * 4))
+        logger.info("开始逐个扫描 %s 个目标，并发数: %s", len(self.targets), workers)
         
-        for i, target in enumerate(self.targets, 1):
-            try:
-                logger.debug(f"扫描目标 {i}/{len(self.targets)}: {target}")
-                result = self._scan_single_target(target)
-                if result:
-                    ip_info_list.append(result)
-                    logger.debug(f"目标 {target} 扫描成功，发现 {len(result.get('port_info', []))} 个开放端口")
-                else:
-                    logger.debug(f"目标 {target} 扫描完成，无开放端口")
-            except Exception as e:
-                logger.error(f"扫描目标 {target} 时发生错误: {str(e)}")
-                import traceback
-                logger.debug(f"详细错误信息: {traceback.format_exc()}")
-                continue
+        if utils.can_run_async_subprocess():
+            # 由一个事件循环统一等待所有子进程
+            ip_info_list = asyncio.run(self._scan_targets_async(workers))
+        else:
+            # 分批扫描的线程池中或已有事件循环时，使用线程池执行
+            ip_info_list = self._scan_targets_threaded(workers)
+        
+        logger.info("逐个扫描完成，共获得 %s 个有效结果", len(ip_info_list))
+        return ip_info_list
+    
+    async def _scan_targets_async(self, workers):
+        semaphore = asyncio.Semaphore(workers)
+        
+        async def scan(target):
+            async with semaphore:
+                return await self._scan_single_target_async(target)
+        
+        results = await asyncio.gather(*(scan(target) for target in self.targets))
+        return [result for result in results if result]
+    
+    def _scan_targets_threaded(self, workers):
+        ip_info_list = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._scan_single_target, target): target for target in self.targets}
+            for future in as_completed(futures):
+                target = futures[future]
+                try:
+                    result = future.result()
+                    if result:
+                        ip_info_list.append(result)
+                except Exception as e:
+                    logger.error("扫描目标 %s 时发生错误: %s", target, e)
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("详细错误信息: %s", traceback.format_exc())
+                    continue
         
-        logger.info(f"逐个扫描完成，共获得 {len(ip_info_list)} 个有效结果")
         return ip_info_list
     
+    def _single_target_timeout(self):
+        """
+        基于端口数、并发与每端口超时动态估算单个目标的超时时间
+        
+        Returns:
+            int: 超时时间（秒）
+        """
+        _port_count = self._port_count
+        _timeout_seconds = max(30, min(900, int((_port_count) / max(1, self.parallelism) * (self.timeout + 2))))
+        logger.debug("设置单个目标超时时间(估算): %s秒 (ports=%s, T=%s, perPortTimeout=%s)", _timeout_seconds, _port_count, self.parallelism, self.timeout)
+        return _timeout_seconds
+    
+    def _handle_single_result(self, target, returncode, stderr, temp_result_file):
+        """
+        处理单个目标扫描进程的执行结果
+        
+        Returns:
+            dict: 扫描结果
+        """
+        logger.debug("目标 %s 命令返回码: %s", target, returncode)
+        logger.debug("目标 %s stderr长度: %s", target, len(stderr) if stderr else 0)
+        
+        if returncode != 0:
+            logger.error("miniscan-port执行失败，目标: %s, 返回码: %s", target, returncode)
+            logger.error("错误输出: %s", (stderr or b'').decode('utf-8', 'ignore'))
+            return None
+        
+        # 检查JSON结果文件是否存在
+        json_result_file = self._resolve_result_file(temp_result_file)
+        if not json_result_file:
+            logger.warning("目标 %s JSON结果文件不存在: %s", target, temp_result_file)
+            return None
+        
+        logger.debug("目标 %s 开始解析JSON文件: %s", target, json_result_file)
+        
+        # 从JSON文件读取结果
+        parsed_results = self._parse_json_file(json_result_file)
+        
+        if parsed_results:
+            logger.debug("目标 %s 解析成功，获得 %s 个结果", target, len(parsed_results))
+            # 返回第一个结果（单个目标扫描通常只有一个结果）
+            return parsed_results[0]
+        else:
+            logger.warning("目标 %s 解析失败", target)
+            return None
+    
     def _scan_single_target(self, target):
         """
         扫描单个目标
@@ -373,117 +562,72 @@ class MiniscanPortScan:
         Returns:
             dict: 扫描结果
         """
-        logger.debug(f"开始扫描单个目标: {target}")
+        logger.debug("开始扫描单个目标: %s", target)
         
-        # 创建临时结果文件
-        temp_result_file = None
         try:
-            temp_result_file = tempfile.mktemp(suffix='.json')
-            logger.debug(f"单个目标结果文件路径: {temp_result_file}")
-            
-            # 构建miniscan-port命令
-            cmd = [self.miniscan_path, '-t', target]
-            
-            # 使用-o参数指定输出文件
-            cmd.extend(['-o', temp_result_file])
-            
-            # 添加-json参数以JSON格式输出
-            cmd.extend(['-json'])
-            
-            # 添加端口参数
-            if self.ports:
-                scan_mode = self._determine_scan_mode(self.ports)
-                logger.debug(f"目标 {target} 扫描模式: {scan_mode}, 端口: {self.ports}")
-                if scan_mode == "custom":
-                    cmd.extend(['-p', self._convert_ports_format(self.ports)])
-                else:
-                    cmd.extend(['-m', scan_mode])
-            else:
-                cmd.extend(['-m', 'top1000'])  # 默认扫描模式
-                logger.debug(f"目标 {target} 使用默认扫描模式: top1000")
-            
-            # 添加线程数
-            cmd.extend(['-T', str(self.parallelism)])
-            
-            # 添加超时时间
-            cmd.extend(['--timeout', str(self.timeout)])
-            
-            logger.debug(f"目标 {target} 执行命令: {' '.join(cmd)}")
-            
-            # 执行命令（动态估算超时时间）
-            if self.ports:
-                _mode = self._determine_scan_mode(self.ports)
-                if _mode == "custom":
-                    _port_count = self._count_ports(self.ports)
-                elif _mode == "top100":
-                    _port_count = 100
-                elif _mode == "top1000":
-                    _port_count = 1000
-                elif _mode == "all":
-                    _port_count = 65535
-                else:
-                    _port_count = 1000
-            else:
-                _port_count = 1000
-            _timeout_seconds = max(30, min(900, int((_port_count) / max(1, self.parallelism) * (self.timeout + 2))))
-            logger.debug(f"目标 {target} 设置超时时间(估算): {_timeout_seconds}秒 (ports={_port_count}, T={self.parallelism}, perPortTimeout={self.timeout})")
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=_timeout_seconds)
-            
-            logger.debug(f"目标 {target} 命令返回码: {result.returncode}")
-            logger.debug(f"目标 {target} stdout长度: {len(result.stdout) if result.stdout else 0}")
-            logger.debug(f"目标 {target} stderr长度: {len(result.stderr) if result.stderr else 0}")
-            
-            if result.returncode != 0:
-                logger.error(f"miniscan-port执行失败，目标: {target}, 返回码: {result.returncode}")
-                logger.error(f"错误输出: {result.stderr}")
-                return None
-            
-            # 检查JSON结果文件是否存在
-            json_result_file = temp_result_file
-            # 等待文件生成，最多 3 秒
-            if not os.path.exists(json_result_file):
-                import time
-                for _ in range(30):
-                    if os.path.exists(json_result_file):
-                        break
-                    time.sleep(0.1)
-            # 兼容老逻辑：如果仍不存在，尝试 temp_result_file + '.json'
-            if not os.path.exists(json_result_file) and os.path.exists(temp_result_file + '.json'):
-                logger.warning(f"目标 {target} JSON结果文件未找到，使用兼容路径: {temp_result_file + '.json'}")
-                json_result_file = temp_result_file + '.json'
-            if not os.path.exists(json_result_file):
-                logger.warning(f"目标 {target} JSON结果文件不存在: {json_result_file}")
-                return None
-            
-            logger.debug(f"目标 {target} 开始解析JSON文件: {json_result_file}")
+            # 临时结果文件在退出时自动删除
+            with self._temp_file('.json') as temp_result_file:
+                logger.debug("单个目标结果文件路径: %s", temp_result_file)
+                
+                # 构建miniscan-port命令，-t 参数直接指定目标
+                cmd = self._build_cmd(target, temp_result_file, self.parallelism)
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("目标 %s 执行命令: %s", target, ' '.join(cmd))
+                
+                # 执行命令（动态估算超时时间）
+                result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                        timeout=self._single_target_timeout())
+                
+                return self._handle_single_result(target, result.returncode, result.stderr, temp_result_file)
             
-            # 从JSON文件读取结果
-            parsed_results = self._parse_json_file(json_result_file)
+        except subprocess.TimeoutExpired:
+            logger.error("扫描目标 %s 超时", target)
+            return None
+        except Exception as e:
+            logger.error("执行miniscan-port时发生错误，目标: %s, 错误: %s", target, e)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("详细错误信息: %s", traceback.format_exc())
+            return None
+    
+    async def _scan_single_target_async(self, target):
+        """
+        异步扫描单个目标，等待子进程时不占用线程
+        
+        Args:
+            target: 目标IP或域名
             
-            if parsed_results:
-                logger.debug(f"目标 {target} 解析成功，获得 {len(parsed_results)} 个结果")
-                # 返回第一个结果（单个目标扫描通常只有一个结果）
-                return parsed_results[0] if parsed_results else None
-            else:
-                logger.warning(f"目标 {target} 解析失败")
-                return None
+        Returns:
+            dict: 扫描结果
+        """
+        logger.debug("开始扫描单个目标: %s", target)
+        
+        proc = None
+        try:
+            with self._temp_file('.json') as temp_result_file:
+                cmd = self._build_cmd(target, temp_result_file, self.parallelism)
+                
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("目标 %s 执行命令: %s", target, ' '.join(cmd))
+                
+                proc = await asyncio.create_subprocess_exec(
+                    *cmd, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+                    start_new_session=True)
+                _, stderr = await asyncio.wait_for(proc.communicate(), timeout=self._single_target_timeout())
+                
+                return self._handle_single_result(target, proc.returncode, stderr, temp_result_file)
             
-        except subprocess.TimeoutExpired:
-            logger.error(f"扫描目标 {target} 超时")
+        except asyncio.TimeoutError:
+            logger.error("扫描目标 %s 超时", target)
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+                await proc.wait()
             return None
         except Exception as e:
-            logger.error(f"执行miniscan-port时发生错误，目标: {target}, 错误: {str(e)}")
-            import traceback
-            logger.debug(f"详细错误信息: {traceback.format_exc()}")
+            logger.error("执行miniscan-port时发生错误，目标: %s, 错误: %s", target, e)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("详细错误信息: %s", traceback.format_exc())
             return None
-        finally:
-            # 清理临时文件
-            if temp_result_file and os.path.exists(temp_result_file):
-                try:
-                    os.unlink(temp_result_file)
-                    logger.debug(f"临时结果文件已清理: {temp_result_file}")
-                except Exception as e:
-                    logger.warning(f"清理临时结果文件失败: {e}")
     
     def _parse_json_file(self, json_file_path):
         """
@@ -495,35 +639,38 @@ class MiniscanPortScan:
         Returns:
             list: 解析后的结果列表
         """
-        logger.debug(f"开始解析JSON文件: {json_file_path}")
+        logger.debug("开始解析JSON文件: %s", json_file_path)
         
         try:
-            # 检查文件是否存在
-            if not os.path.exists(json_file_path):
-                logger.error(f"JSON文件不存在: {json_file_path}")
-                return []
+            if Config.PORT_SCAN_JSONL:
+                results = self._parse_jsonl_file(json_file_path)
+                if results is not None:
+                    return results
+            
+            if ijson is not None:
+                return self._parse_json_stream(json_file_path)
             
             # 读取JSON文件
-            with open(json_file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
+            with open(json_file_path, 'rb') as f:
+                content = f.read()
             
-            logger.debug(f"JSON文件大小: {len(content)} 字符")
+            logger.debug("JSON文件大小: %s 字节", len(content))
             
-            if not content:
+            if not content.strip():
                 logger.warning("JSON文件为空")
                 return []
             
             # 解析JSON
-            data = json.loads(content)
-            logger.debug(f"JSON解析成功，数据类型: {type(data)}")
+            data = json_loads(content)
+            logger.debug("JSON解析成功，数据类型: %s", type(data))
             
-            # 检查数据结构
-            if isinstance(data, dict):
-                logger.debug(f"JSON为字典，键: {list(data.keys())}")
+            # 检查数据结构，最常见的是单个字典，直接走快速路径
+            data_type = type(data)
+            if data_type is dict:
                 # 处理单个扫描结果
-                return self._parse_single_json_result(data)
-            elif isinstance(data, list):
-                logger.debug(f"JSON为列表，长度: {len(data)}")
+                return self._parse_result_dict(data)
+            elif data_type is list:
+                logger.debug("JSON为列表，长度: %s", len(data))
                 # 处理多个扫描结果
                 results = []
                 for item in data:
@@ -532,64 +679,128 @@ class MiniscanPortScan:
                         results.extend(parsed)
                 return results
             else:
-                logger.warning(f"未识别的JSON数据类型: {type(data)}")
+                logger.warning("未识别的JSON数据类型: %s", type(data))
                 return []
                 
+        except FileNotFoundError:
+            logger.error("JSON文件不存在: %s", json_file_path)
+            return []
         except json.JSONDecodeError as e:
-            logger.error(f"JSON解析失败: {str(e)}")
-            logger.debug(f"文件内容前500字符: {content[:500] if 'content' in locals() else 'N/A'}")
+            logger.error("JSON解析失败: %s", e)
+            logger.debug("文件内容前500字符: %s", content[:500] if 'content' in locals() else 'N/A')
             return []
         except Exception as e:
-            logger.error(f"解析JSON文件时发生错误: {str(e)}")
-            import traceback
-            logger.debug(f"详细错误信息: {traceback.format_exc()}")
+            logger.error("解析JSON文件时发生错误: %s", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("详细错误信息: %s", traceback.format_exc())
             return []
     
-    def _parse_single_json_result(self, data):
+    def _parse_json_stream(self, json_file_path):
         """
-        解析单个JSON扫描结果
+        使用ijson逐个读取open_ports中的端口，不把整个文件载入内存
         
         Args:
-            data (dict): 单个扫描结果数据
+            json_file_path (str): JSON结果文件路径
             
         Returns:
             list: 解析后的结果列表
         """
-        logger.debug(f"解析单个JSON结果，数据键: {list(data.keys()) if isinstance(data, dict) else 'N/A'}")
-        
-        if not isinstance(data, dict):
-            logger.warning(f"数据不是字典类型: {type(data)}")
-            return []
-        
-        # 检查是否有open_ports字段
-        if 'open_ports' not in data:
-            logger.warning("JSON数据中没有找到open_ports字段")
-            return []
-        
-        open_ports = data.get('open_ports', [])
-        logger.debug(f"发现 {len(open_ports)} 个开放端口")
+        with open(json_file_path, 'rb') as f:
+            # 根据第一个非空白字符判断顶层是对象还是数组
+            head = f.read(64).lstrip()
+            if not head:
+                logger.warning("JSON文件为空")
+                return []
+            
+            f.seek(0)
+            prefix = 'item.open_ports.item' if head[:1] == b'[' else 'open_ports.item'
+            return self._group_open_ports(ijson.items(f, prefix))
+    
+    def _parse_jsonl_file(self, json_file_path):
+        """
+        逐行解析JSON-Lines格式的结果文件，内存中只保留当前行
         
-        if not open_ports:
-            logger.debug("没有开放端口")
-            return []
+        Args:
+            json_file_path (str): 结果文件路径
+            
+        Returns:
+            list: 解析后的结果列表，文件不是JSON-Lines格式时返回None
+        """
+        with open(json_file_path, 'rb') as f:
+            first_line = b''
+            for first_line in f:
+                if first_line.strip():
+                    break
+            
+            if not first_line.strip():
+                logger.warning("JSON文件为空")
+                return []
+            
+            try:
+                first = json_loads(first_line)
+            except ValueError:
+                # miniscan-port不支持-jsonl时仍输出完整JSON，交给常规解析
+                logger.debug("结果文件不是JSON-Lines格式，使用常规解析")
+                return None
+            
+            return self._group_open_ports(self._iter_jsonl_ports(first, f))
+    
+    def _iter_jsonl_ports(self, first, lines):
+        """
+        从JSON-Lines记录中逐个取出端口数据
+        每行可以是单个端口记录，也可以是带open_ports字段的主机记录
+        """
+        record = first
+        while True:
+            if type(record) is dict:
+                if 'open_ports' in record:
+                    yield from record['open_ports'] or ()
+                else:
+                    yield record
+            
+            line = next(lines, None)
+            while line is not None and not line.strip():
+                line = next(lines, None)
+            if line is None:
+                return
+            
+            try:
+                record = json_loads(line)
+            except ValueError:
+                logger.warning("跳过无法解析的结果行: %r", line[:200])
+                record = None
+    
+    def _group_open_ports(self, open_ports):
+        """
+        按主机分组端口信息
         
-        # 按主机分组端口信息
-        host_ports = {}
+        Args:
+            open_ports: open_ports中的端口数据，可以是任意可迭代对象
+            
+        Returns:
+            list: 解析后的结果列表
+        """
+        host_ports = defaultdict(list)
         for port_data in open_ports:
             host = port_data.get('host', '')
             if not host:
-                logger.warning(f"端口数据缺少host字段: {port_data}")
+                logger.warning("端口数据缺少host字段: %s", port_data)
                 continue
             
-            if host not in host_ports:
-                host_ports[host] = []
+            # 同一主机的每个端口都带有一份host字符串，驻留后共享同一对象
+            host = sys.intern(host)
+            
+            # 服务名重复度很高，同样驻留共享
+            service = port_data.get('service', '')
+            if type(service) is str:
+                service = sys.intern(service)
             
             # 构建端口信息
             port_info = {
                 'port_id': port_data.get('port', 0),
-                'service_name': port_data.get('service', ''),
+                'service_name': service,
                 'version': '',  # miniscan-port通常不提供版本信息
-                'product': port_data.get('service', ''),
+                'product': service,
                 'protocol': 'tcp'  # 默认为tcp
             }
             
@@ -598,7 +809,7 @@ class MiniscanPortScan:
         # 构建最终结果
         results = []
         for host, ports in host_ports.items():
-            logger.debug(f"主机 {host} 有 {len(ports)} 个开放端口")
+            logger.debug("主机 %s 有 %s 个开放端口", host, len(ports))
             
             result = {
                 'ip': host,
@@ -607,83 +818,116 @@ class MiniscanPortScan:
             }
             results.append(result)
         
-        logger.debug(f"解析完成，返回 {len(results)} 个主机结果")
+        logger.debug("解析完成，返回 %s 个主机结果", len(results))
         return results
+    
+    def _parse_single_json_result(self, data):
+        """
+        解析单个JSON扫描结果
+        
+        Args:
+            data (dict): 单个扫描结果数据
+            
+        Returns:
+            list: 解析后的结果列表
+        """
+        if type(data) is not dict:
+            logger.warning("数据不是字典类型: %s", type(data))
+            return []
+        
+        return self._parse_result_dict(data)
+    
+    def _parse_result_dict(self, data):
+        """
+        解析已确认为字典的单个JSON扫描结果
+        
+        Args:
+            data (dict): 单个扫描结果数据
+            
+        Returns:
+            list: 解析后的结果列表
+        """
+        # 检查是否有open_ports字段
+        if 'open_ports' not in data:
+            logger.warning("JSON数据中没有找到open_ports字段")
+            return []
+        
+        open_ports = data.get('open_ports', [])
+        logger.debug("发现 %s 个开放端口", len(open_ports))
+        
+        if not open_ports:
+            logger.debug("没有开放端口")
+            return []
+        
+        return self._group_open_ports(open_ports)
+    
+    def _extract_json_from_output(self, output):
         """
         从miniscan-port的输出中提取JSON部分
         miniscan-port的输出包含ASCII艺术字和进度信息，需要提取纯JSON部分
+        这里只按边界截取，不做校验解析，非法内容由调用方解析时处理
         
         Args:
-            output: miniscan-port的完整输出
+            output: miniscan-port的完整输出，str 或 bytes
             
         Returns:
             str: 提取的JSON字符串，如果没有找到则返回None
         """
-        logger.debug(f"开始提取JSON，输出总长度: {len(output)}")
-        logger.debug(f"输出前200字符: {output[:200]}")
+        logger.debug("开始提取JSON，输出总长度: %s", len(output))
         
-        try:
-            # 查找JSON开始位置（第一个 '{' 字符）
-            json_start = output.find('{')
-            if json_start == -1:
-                logger.warning("未找到JSON开始字符'{'")
-                return None
-            
-            # 查找JSON结束位置（最后一个 '}' 字符）
-            json_end = output.rfind('}')
-            if json_end == -1 or json_end <= json_start:
-                logger.warning(f"未找到有效的JSON结束字符'}}', json_start: {json_start}, json_end: {json_end}")
-                return None
-            
-            logger.debug(f"JSON边界位置 - 开始: {json_start}, 结束: {json_end}")
-            
-            # 提取JSON部分
-            json_str = output[json_start:json_end + 1].strip()
-            
-            logger.debug(f"提取的JSON长度: {len(json_str)}")
-            logger.debug(f"提取的JSON前200字符: {json_str[:200]}")
-            
-            # 验证提取的内容是否为有效JSON
-            json.loads(json_str)
-            logger.debug("JSON验证成功")
-            return json_str
-            
-        except (json.JSONDecodeError, ValueError) as e:
-            logger.error(f"提取JSON时发生错误: {e}")
-            logger.debug(f"错误的JSON内容: {json_str[:500] if 'json_str' in locals() else 'N/A'}")
+        # bytes 直接按字节查找，省去上游的解码
+        if isinstance(output, bytes):
+            open_char, close_char = b'{', b'}'
+        else:
+            open_char, close_char = '{', '}'
+        
+        # 查找JSON开始位置（第一个 '{' 字符）
+        json_start = output.find(open_char)
+        if json_start == -1:
+            logger.warning("未找到JSON开始字符'{'")
+            return None
+        
+        # 查找JSON结束位置（最后一个 '}' 字符）
+        json_end = output.rfind(close_char)
+        if json_end <= json_start:
+            logger.warning("未找到有效的JSON结束字符'}', json_start: %s, json_end: %s", json_start, json_end)
             return None
+        
+        logger.debug("JSON边界位置 - 开始: %s, 结束: %s", json_start, json_end)
+        
+        return output[json_start:json_end + 1]
     
     def _parse_miniscan_output(self, output, target):
         """解析miniscan-port的输出"""
-        logger.debug(f"开始解析目标 {target} 的输出")
+        logger.debug("开始解析目标 %s 的输出", target)
         
         try:
             if not output.strip():
-                logger.warning(f"目标 {target} 输出为空")
+                logger.warning("目标 %s 输出为空", target)
                 return None
             
             # 提取JSON部分 - miniscan-port输出包含非JSON内容
             json_str = self._extract_json_from_output(output)
             if not json_str:
-                logger.warning(f"无法从输出中提取JSON内容，目标: {target}")
+                logger.warning("无法从输出中提取JSON内容，目标: %s", target)
                 return None
             
             # 尝试解析JSON
-            data = json.loads(json_str)
-            logger.debug(f"目标 {target} JSON解析成功，数据类型: {type(data)}")
+            data = json_loads(json_str)
+            logger.debug("目标 %s JSON解析成功，数据类型: %s", target, type(data))
             
             # 检查数据结构
             if isinstance(data, dict):
-                logger.debug(f"目标 {target} JSON为字典，键: {list(data.keys())}")
+                logger.debug("目标 %s JSON为字典，键: %s", target, list(data.keys()))
             elif isinstance(data, list):
-                logger.debug(f"目标 {target} JSON为列表，长度: {len(data)}")
+                logger.debug("目标 %s JSON为列表，长度: %s", target, len(data))
             
             # 提取端口信息 - 适配新的输出格式
             port_info = []
             
             # 新格式：直接使用 open_ports 字段
             if 'open_ports' in data and data['open_ports']:
-                logger.debug(f"目标 {target} 使用新格式（open_ports），端口数量: {len(data['open_ports'])}")
+                logger.debug("目标 %s 使用新格式（open_ports），端口数量: %s", target, len(data['open_ports']))
                 for port_data in data['open_ports']:
                     port_info.append({
                         'port_id': port_data.get('port', 0),
@@ -696,10 +940,10 @@ class MiniscanPortScan:
             
             # 兼容旧格式：results.ports 结构
             elif 'results' in data and data['results']:
-                logger.debug(f"目标 {target} 使用旧格式（results.ports）")
+                logger.debug("目标 %s 使用旧格式（results.ports）", target)
                 for result in data['results']:
                     if 'ports' in result and result['ports']:
-                        logger.debug(f"目标 {target} 发现端口数量: {len(result['ports'])}")
+                        logger.debug("目标 %s 发现端口数量: %s", target, len(result['ports']))
                         for port_data in result['ports']:
                             port_info.append({
                                 'port_id': port_data.get('port', 0),
@@ -709,9 +953,9 @@ class MiniscanPortScan:
                                 'banner': port_data.get('banner', '')
                             })
             else:
-                logger.warning(f"目标 {target} 未识别的JSON格式: {json_str[:200]}")
+                logger.warning("目标 %s 未识别的JSON格式: %s", target, json_str[:200])
             
-            logger.debug(f"目标 {target} 最终解析出 {len(port_info)} 个端口")
+            logger.debug("目标 %s 最终解析出 %s 个端口", target, len(port_info))
             
             return {
                 'ip': target,
@@ -719,13 +963,13 @@ class MiniscanPortScan:
             }
             
         except json.JSONDecodeError as e:
-            logger.error(f"解析miniscan-port JSON输出失败: {str(e)}")
-            logger.debug(f"原始输出内容: {output[:500]}...")  # 只记录前500字符
+            logger.error("解析miniscan-port JSON输出失败: %s", e)
+            logger.debug("原始输出内容: %s...", output[:500])  # 只记录前500字符
             return None
         except Exception as e:
-            logger.error(f"处理miniscan-port输出时发生错误: {str(e)}")
-            import traceback
-            logger.debug(f"详细错误信息: {traceback.format_exc()}")
+            logger.error("处理miniscan-port输出时发生错误: %s", e)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("详细错误信息: %s", traceback.format_exc())
             return None
 
     def _parse_batch_output(self, output):
@@ -738,7 +982,7 @@ class MiniscanPortScan:
         Returns:
             list: ARL格式的扫描结果列表
         """
-        logger.info(f"开始解析批量扫描输出，输出长度: {len(output)} 字符")
+        logger.info("开始解析批量扫描输出，输出长度: %s 字符", len(output))
         
         ip_info_list = []
         
@@ -750,7 +994,7 @@ class MiniscanPortScan:
                 return self._parse_console_batch_output(output)
             
             logger.info("检测到JSON格式输出，开始解析")
-            data = json.loads(json_str)
+            data = json_loads(json_str)
             
             # 处理单个结果对象
             if isinstance(data, dict):
@@ -761,20 +1005,20 @@ class MiniscanPortScan:
             
             # 处理结果数组
             elif isinstance(data, list):
-                logger.info(f"解析JSON数组，包含 {len(data)} 个元素")
+                logger.info("解析JSON数组，包含 %s 个元素", len(data))
                 for item in data:
                     result = self._parse_single_result(item)
                     if result:
                         ip_info_list.append(result)
         
         except json.JSONDecodeError as e:
-            logger.error(f"解析批量扫描JSON输出失败: {e}，尝试解析控制台输出")
+            logger.error("解析批量扫描JSON输出失败: %s，尝试解析控制台输出", e)
             ip_info_list = self._parse_console_batch_output(output)
         except Exception as e:
-            logger.error(f"解析批量扫描输出时发生异常: {e}")
+            logger.error("解析批量扫描输出时发生异常: %s", e)
             ip_info_list = []
         
-        logger.info(f"批量扫描完成，发现 {len(ip_info_list)} 个有结果的目标")
+        logger.info("批量扫描完成，发现 %s 个有结果的目标", len(ip_info_list))
         return ip_info_list
     
     def _parse_single_result(self, data):
@@ -853,6 +1097,37 @@ class MiniscanPortScan:
         # 如果都不匹配，返回None
         return None
     
+    @staticmethod
+    def _iter_console_ports(output):
+        """
+        从控制台输出中逐个取出开放端口，格式如: "192.168.1.100:80 [HTTP]"
+        整段输出交给正则逐个匹配，不再按行拆分
+        
+        Args:
+            output: 控制台输出，str 或 bytes
+            
+        Yields:
+            tuple: (ip, port, service_name)
+        """
+        if isinstance(output, bytes):
+            output = output.decode('utf-8', 'ignore')
+        
+        for m in CONSOLE_PORT_RE.finditer(output):
+            yield m.groups()
+    
+    @staticmethod
+    def _console_port_info(port, service_name):
+        """
+        构建ARL格式的端口信息
+        """
+        return {
+            "port_id": int(port),
+            "service_name": intern_service_name(service_name),
+            "version": '',
+            "product": '',
+            "protocol": 'tcp'
+        }
+    
     def _parse_console_batch_output(self, output):
         """
         解析批量扫描的控制台输出
@@ -863,51 +1138,24 @@ class MiniscanPortScan:
         Returns:
             list: ARL格式的扫描结果列表
         """
-        ip_info_dict = {}  # 使用字典按IP分组
+        ip_ports = defaultdict(list)  # 使用字典按IP分组
         
-        lines = output.split('\n')
-        for line in lines:
-            line = line.strip()
-            
-            # 查找开放端口信息，格式如: "192.168.1.100:80 [HTTP]"
-            if ':' in line and '[' in line and ']' in line:
-                try:
-                    # 提取IP和端口
-                    ip_port = line.split('[')[0].strip()
-                    if ':' in ip_port:
-                        ip, port = ip_port.split(':')
-                        
-                        # 提取服务名
-                        service_start = line.find('[')
-                        service_end = line.find(']')
-                        service_name = ''
-                        if service_start != -1 and service_end != -1:
-                            service_name = line[service_start+1:service_end]
-                        
-                        port_info = {
-                            "port_id": int(port),
-                            "service_name": service_name.lower(),
-                            "version": '',
-                            "product": '',
-                            "protocol": 'tcp'
-                        }
-                        
-                        # 按IP分组
-                        if ip not in ip_info_dict:
-                            ip_info_dict[ip] = {
-                                "ip": ip,
-                                "port_info": [],
-                                "os_info": {}
-                            }
-                        
-                        ip_info_dict[ip]["port_info"].append(port_info)
-                        
-                except (ValueError, IndexError) as e:
-                    logger.debug(f"解析端口信息失败: {line}, 错误: {str(e)}")
-                    continue
+        # 解析阶段只记录 (端口, 服务名)，返回前再统一构建端口信息
+        for ip, port, service_name in self._iter_console_ports(output):
+            ip_ports[ip].append((port, service_name))
         
         # 转换为列表
-        return list(ip_info_dict.values())
+        return [
+            {
+                "ip": ip,
+                "port_info": [
+                    self._console_port_info(port, service_name)
+                    for port, service_name in ports
+                ],
+                "os_info": {}
+            }
+            for ip, ports in ip_ports.items()
+        ]
     
     def _parse_console_output(self, output, target):
         """
@@ -920,38 +1168,10 @@ class MiniscanPortScan:
         Returns:
             dict: ARL格式的扫描结果
         """
-        port_info_list = []
-        
-        lines = output.split('\n')
-        for line in lines:
-            line = line.strip()
-            
-            # 查找开放端口信息，格式如: "192.168.1.100:80 [HTTP]"
-            if ':' in line and '[' in line and ']' in line:
-                try:
-                    # 提取IP和端口
-                    ip_port = line.split('[')[0].strip()
-                    if ':' in ip_port:
-                        ip, port = ip_port.split(':')
-                        
-                        # 提取服务名
-                        service_start = line.find('[')
-                        service_end = line.find(']')
-                        service_name = ''
-                        if service_start != -1 and service_end != -1:
-                            service_name = line[service_start+1:service_end]
-                        
-                        port_info = {
-                            "port_id": int(port),
-                            "service_name": service_name.lower(),
-                            "version": '',
-                            "product": '',
-                            "protocol": 'tcp'
-                        }
-                        port_info_list.append(port_info)
-                        
-                except (ValueError, IndexError) as e:
-                    continue
+        port_info_list = [
+            self._console_port_info(port, service_name)
+            for _, port, service_name in self._iter_console_ports(output)
+        ]
         
         # 构建IP信息
         ip_info = {
@@ -962,7 +1182,6 @@ class MiniscanPortScan:
         
         return ip_info if port_info_list else None
 
-
 def port_scan(targets, ports=Config.TOP_10, service_detect=False, os_detect=False,
               port_parallelism=32, port_min_rate=64, custom_host_timeout=None, port_scan_type=None):
     """
@@ -983,8 +1202,7 @@ def port_scan(targets, ports=Config.TOP_10, service_detect=False, os_detect=Fals
         list: 扫描结果列表
     """
     # 过滤目标列表
-    targets = list(set(targets))
-    targets = list(filter(utils.not_in_black_ips, targets))
+    targets = [target for target in set(targets) if utils.not_in_black_ips(target)]
     
     if not targets:
         logger.warning("没有有效的扫描目标")
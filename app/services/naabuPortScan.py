@@ -1,13 +1,66 @@
 import os
+import re
 import json
+import sys
+import logging
+import traceback
+import mmap
+import threading
+import shutil
+import functools
 import subprocess
 import tempfile
-import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from app import utils
 from app.config import Config
 
+try:
+    # orjson 直接解析 bytes，比标准库快数倍
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
 logger = utils.get_logger()
 
+# 匹配端口字符串中的单个端口或端口范围，如 80 或 8080-8090
+PORT_RANGE_RE = re.compile(r'(\d+)(?:\s*-\s*(\d+))?')
+
+# NDJSON结果行的首字符，兼容 str 和 bytes 两种输入
+JSON_LINE_PREFIXES = ('{', b'{')
+
+
+@functools.lru_cache(maxsize=1)
+def resolve_naabu_path():
+    """
+    查找naabu工具的路径，结果在进程内缓存，避免每次创建扫描器都访问磁盘
+    
+    Returns:
+        str: naabu工具的完整路径
+    """
+    # 首先尝试从tools目录获取
+    tools_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tools')
+    naabu_path = os.path.join(tools_dir, 'naabu')
+    
+    # Windows系统添加.exe扩展名
+    if os.name == 'nt':
+        naabu_path += '.exe'
+    
+    if os.path.exists(naabu_path):
+        logger.debug("找到naabu工具: %s", naabu_path)
+        return naabu_path
+    
+    # 如果tools目录没有，在系统PATH中查找，不再启动 which 子进程
+    system_path = shutil.which('naabu')
+    if system_path:
+        logger.debug("在系统PATH中找到naabu: %s", system_path)
+        return system_path
+    
+    # 默认返回naabu，让系统尝试在PATH中查找
+    logger.warning("未找到naabu工具，将尝试使用系统PATH")
+    return 'naabu'
+
 
 class NaabuPortScan:
     """
@@ -41,6 +94,10 @@ class NaabuPortScan:
         self.custom_host_timeout = custom_host_timeout
         self.port_scan_type = port_scan_type
         
+        # 扫描模式和端口数在一次扫描中不会变化，只计算一次
+        self._scan_mode = self._determine_scan_mode(self.ports) if self.ports else "1000"
+        self._port_count = self._estimate_port_count()
+        
         # 获取naabu工具路径
         self.naabu_path = self._get_naabu_path()
         
@@ -57,31 +114,7 @@ class NaabuPortScan:
         Returns:
             str: naabu工具的完整路径
         """
-        # 首先尝试从tools目录获取
-        tools_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tools')
-        naabu_path = os.path.join(tools_dir, 'naabu')
-        
-        # Windows系统添加.exe扩展名
-        if os.name == 'nt':
-            naabu_path += '.exe'
-        
-        if os.path.exists(naabu_path):
-            logger.debug(f"找到naabu工具: {naabu_path}")
-            return naabu_path
-        
-        # 如果tools目录没有，尝试系统PATH
-        try:
-            result = subprocess.run(['which', 'naabu'], capture_output=True, text=True)
-            if result.returncode == 0:
-                system_path = result.stdout.strip()
-                logger.debug(f"在系统PATH中找到naabu: {system_path}")
-                return system_path
-        except:
-            pass
-        
-        # 默认返回naabu，让系统尝试在PATH中查找
-        logger.warning("未找到naabu工具，将尝试使用系统PATH")
-        return 'naabu'
+        return resolve_naabu_path()
 
     def _determine_scan_mode(self, ports_str):
         """
@@ -108,6 +141,18 @@ class NaabuPortScan:
         else:
             return "custom"
 
+    def _estimate_port_count(self):
+        """
+        根据扫描模式估算端口数量
+        
+        Returns:
+            int: 端口数量
+        """
+        if self._scan_mode == "custom":
+            return self._count_ports(self.ports)
+        
+        return {"100": 100, "1000": 1000, "full": 65535}.get(self._scan_mode, 1000)
+
     def _convert_ports_format(self, ports_str):
         """
         将ARL的端口格式转换为naabu支持的格式
@@ -146,21 +191,22 @@ class NaabuPortScan:
         # 创建临时文件存储目标列表和结果
         temp_target_file = None
         temp_result_file = None
+        timeout_seconds = None
         try:
             logger.info(f"开始批量扫描 {len(self.targets)} 个目标")
             
             # 创建临时目标文件
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.txt') as f:
+            with tempfile.NamedTemporaryFile(mode='wb', buffering=0, delete=False, suffix='.txt',
+                                             dir=Config.TMP_PATH) as f:
                 temp_target_file = f.name
-                # 将目标写入临时文件，每行一个
-                for target in self.targets:
-                    f.write(f"{target}\n")
+                # 将目标写入临时文件，每行一个，拼接后一次写入
+                f.write(('\n'.join(self.targets) + '\n').encode('utf-8'))
             
             # 创建临时结果文件
-            temp_result_file = tempfile.mktemp(suffix='.json')
+            temp_result_file = self._create_result_file()
             
-            logger.debug(f"目标文件已创建: {temp_target_file}")
-            logger.debug(f"结果文件路径: {temp_result_file}")
+            logger.debug("目标文件已创建: %s", temp_target_file)
+            logger.debug("结果文件路径: %s", temp_result_file)
             
             # 构建naabu命令
             cmd = [self.naabu_path]
@@ -171,13 +217,13 @@ class NaabuPortScan:
             # 使用-o参数指定输出文件
             cmd.extend(['-o', temp_result_file])
             
-            # 添加-json参数以JSON格式输出
-            cmd.extend(['-json'])
+            # 添加-json参数以JSON格式输出，-silent 让stdout只输出结果行，不输出banner和进度
+            cmd.extend(['-json', '-silent'])
             
             # 添加端口参数
             if self.ports:
-                scan_mode = self._determine_scan_mode(self.ports)
-                logger.debug(f"扫描模式: {scan_mode}, 端口: {self.ports}")
+                scan_mode = self._scan_mode
+                logger.debug("扫描模式: %s, 端口: %s", scan_mode, self.ports)
                 if scan_mode == "custom":
                     cmd.extend(['-p', self._convert_ports_format(self.ports)])
                 else:
@@ -196,24 +242,15 @@ class NaabuPortScan:
             if self.custom_host_timeout:
                 cmd.extend(['-timeout', f"{self.custom_host_timeout}s"])
             
-            logger.info(f"执行命令: {' '.join(cmd)}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("执行命令: %s", ' '.join(cmd))
             logger.info(f"扫描参数 - 并发数: {self.parallelism}, 速率: {self.rate}包/秒")
             if self.custom_host_timeout:
                 logger.info(f"自定义超时时间: {self.custom_host_timeout}秒")
             
             # 执行扫描
             # 基于端口数和目标数估算超时时间
-            scan_mode = self._determine_scan_mode(self.ports) if self.ports else "1000"
-            if scan_mode == "custom":
-                port_count = self._count_ports(self.ports)
-            elif scan_mode == "100":
-                port_count = 100
-            elif scan_mode == "1000":
-                port_count = 1000
-            elif scan_mode == "full":
-                port_count = 65535
-            else:
-                port_count = 1000
+            port_count = self._port_count
             
             # 估算超时时间：基于端口数、目标数和速率的更合理计算
             # 基础时间 + (端口数 * 目标数) / 速率 * 安全系数 + 额外缓冲时间
@@ -228,97 +265,151 @@ class NaabuPortScan:
                 buffer_time = 600  # 10分钟缓冲
             
             timeout_seconds = max(600, min(7200, int(base_timeout + scan_time * safety_factor + buffer_time)))
-            logger.debug(f"设置总超时时间(估算): {timeout_seconds}秒 (targets={len(self.targets)}, ports={port_count}, rate={self.rate})")
+            logger.debug("设置总超时时间(估算): %s秒 (targets=%s, ports=%s, rate=%s)", timeout_seconds, len(self.targets), port_count, self.rate)
             logger.info(f"预计扫描时间: {int(scan_time)}秒, 总超时时间: {timeout_seconds}秒")
             
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout_seconds)
+            # 边扫描边解析stdout中的结果行
+            returncode, results, timed_out, stderr = self._run_naabu(cmd, timeout_seconds)
             
-            logger.debug(f"naabu返回码: {result.returncode}")
-            logger.debug(f"stdout长度: {len(result.stdout) if result.stdout else 0}")
-            logger.debug(f"stderr长度: {len(result.stderr) if result.stderr else 0}")
+            logger.debug("naabu返回码: %s", returncode)
+            logger.debug("stderr长度: %s", len(stderr))
+            
+            if timed_out:
+                logger.error(f"naabu批量扫描超时 ({timeout_seconds}秒)")
+                if results:
+                    # 保留超时前已经解析出的结果
+                    logger.warning(f"保留超时前已解析的 {len(results)} 个主机结果")
+                    return results
+                
+                logger.info("批量扫描超时，尝试回退到单个目标扫描模式")
+                # 超时时也尝试回退到单个扫描
+                try:
+                    return self._scan_targets_individually()
+                except Exception as fallback_error:
+                    logger.error(f"单个扫描回退也失败: {str(fallback_error)}")
+                    return []
             
-            if result.returncode != 0:
-                logger.error(f"naabu批量扫描失败，返回码: {result.returncode}")
-                logger.error(f"错误输出: {result.stderr}")
+            if returncode != 0:
+                logger.error(f"naabu批量扫描失败，返回码: {returncode}")
+                logger.error(f"错误输出: {stderr.decode('utf-8', 'ignore')}")
                 # 如果批量扫描失败，回退到单个扫描
                 logger.info("回退到单个目标扫描模式")
                 return self._scan_targets_individually()
             
-            # 等待结果文件生成
-            max_wait = 10
-            wait_count = 0
-            while not os.path.exists(temp_result_file) and wait_count < max_wait:
-                time.sleep(1)
-                wait_count += 1
-            
-            if not os.path.exists(temp_result_file):
-                logger.warning("结果文件未生成，尝试解析stdout输出")
-                if result.stdout:
-                    return self._parse_naabu_output(result.stdout)
-                else:
-                    logger.error("没有可解析的输出")
+            # stdout中没有解析到结果时，再读取 -o 结果文件
+            if not results and self._has_result(temp_result_file):
+                logger.warning("stdout中没有解析到结果，尝试读取结果文件")
+                try:
+                    return self._parse_naabu_file(temp_result_file)
+                except Exception as e:
+                    logger.error(f"读取结果文件失败: {str(e)}")
                     return []
             
-            # 读取JSON结果文件
-            try:
-                with open(temp_result_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    if content.strip():
-                        logger.info(f"成功读取结果文件，内容长度: {len(content)} 字符")
-                        return self._parse_naabu_output(content)
-                    else:
-                        logger.warning("结果文件为空")
-                        return []
-            except Exception as e:
-                logger.error(f"读取结果文件失败: {str(e)}")
-                return []
+            return results
                 
-        except subprocess.TimeoutExpired:
-            logger.error(f"naabu批量扫描超时 ({timeout_seconds}秒)")
-            logger.info("批量扫描超时，尝试回退到单个目标扫描模式")
-            # 超时时也尝试回退到单个扫描
-            try:
-                return self._scan_targets_individually()
-            except Exception as fallback_error:
-                logger.error(f"单个扫描回退也失败: {str(fallback_error)}")
-                return []
         except Exception as e:
             logger.error(f"批量扫描过程中发生错误: {str(e)}")
-            import traceback
-            logger.debug(f"详细错误信息: {traceback.format_exc()}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("详细错误信息: %s", traceback.format_exc())
             return []
         finally:
             # 清理临时文件
             if temp_target_file and os.path.exists(temp_target_file):
                 try:
                     os.unlink(temp_target_file)
-                    logger.debug(f"已删除临时目标文件: {temp_target_file}")
+                    logger.debug("已删除临时目标文件: %s", temp_target_file)
                 except:
                     pass
             if temp_result_file and os.path.exists(temp_result_file):
                 try:
                     os.unlink(temp_result_file)
-                    logger.debug(f"已删除临时结果文件: {temp_result_file}")
+                    logger.debug("已删除临时结果文件: %s", temp_result_file)
                 except:
                     pass
 
+    def _run_naabu(self, cmd, timeout):
+        """
+        启动naabu并逐行解析stdout中的结果，解析与扫描同时进行
+        超时后终止naabu，已经解析出的结果不会丢失
+        
+        Args:
+            cmd: naabu命令参数列表
+            timeout: 超时时间（秒）
+            
+        Returns:
+            tuple: (返回码, 解析后的结果列表, 是否超时, stderr内容)
+        """
+        # stderr 写入匿名临时文件，避免管道写满阻塞naabu
+        with tempfile.TemporaryFile() as stderr_file:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file, bufsize=65536)
+            timed_out = threading.Event()
+            
+            def on_timeout():
+                timed_out.set()
+                proc.terminate()
+            
+            timer = threading.Timer(timeout, on_timeout)
+            timer.daemon = True
+            timer.start()
+            try:
+                with proc.stdout:
+                    results = self._parse_naabu_lines(proc.stdout)
+                returncode = proc.wait()
+            finally:
+                timer.cancel()
+                if proc.poll() is None:
+                    proc.kill()
+                    proc.wait()
+            
+            stderr_file.seek(0)
+            stderr = stderr_file.read()
+        
+        return returncode, results, timed_out.is_set(), stderr
+
+    def _create_result_file(self):
+        """
+        在 TMP_PATH 下创建空的结果文件，使用 O_EXCL 创建，避免 mktemp 的竞争问题
+        
+        Returns:
+            str: 结果文件路径
+        """
+        with tempfile.NamedTemporaryFile(suffix='.json', dir=Config.TMP_PATH, delete=False) as f:
+            return f.name
+
+    @staticmethod
+    def _has_result(result_file):
+        """
+        结果文件已预先创建，naabu写入内容后才算生成了结果
+        """
+        try:
+            return os.path.getsize(result_file) > 0
+        except OSError:
+            return False
+
     def _scan_targets_individually(self):
         """
-        逐个扫描目标（回退方案）
+        逐个扫描目标（回退方案），多个目标并发执行
         
         Returns:
             list: 扫描结果列表
         """
         ip_info_list = []
+        if not self.targets:
+            return ip_info_list
         
-        for target in self.targets:
-            try:
-                result = self._scan_single_target(target)
-                if result:
-                    ip_info_list.append(result)
-            except Exception as e:
-                logger.error(f"扫描目标 {target} 时发生错误: {str(e)}")
-                continue
+        # 每个目标都是独立的naabu子进程，等待期间不占用GIL，用线程池并发执行
+        workers = min(8, len(self.targets))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self._scan_single_target, target): target for target in self.targets}
+            for future in as_completed(futures):
+                target = futures[future]
+                try:
+                    result = future.result()
+                    if result:
+                        ip_info_list.append(result)
+                except Exception as e:
+                    logger.error(f"扫描目标 {target} 时发生错误: {str(e)}")
+                    continue
         
         return ip_info_list
 
@@ -332,13 +423,13 @@ class NaabuPortScan:
         Returns:
             dict: 扫描结果
         """
-        logger.debug(f"开始扫描单个目标: {target}")
+        logger.debug("开始扫描单个目标: %s", target)
         
         # 创建临时结果文件
         temp_result_file = None
         try:
-            temp_result_file = tempfile.mktemp(suffix='.json')
-            logger.debug(f"单个目标结果文件路径: {temp_result_file}")
+            temp_result_file = self._create_result_file()
+            logger.debug("单个目标结果文件路径: %s", temp_result_file)
             
             # 构建naabu命令
             cmd = [self.naabu_path, '-host', target]
@@ -346,20 +437,20 @@ class NaabuPortScan:
             # 使用-o参数指定输出文件
             cmd.extend(['-o', temp_result_file])
             
-            # 添加-json参数以JSON格式输出
-            cmd.extend(['-json'])
+            # 添加-json参数以JSON格式输出，-silent 让stdout只输出结果行，不输出banner和进度
+            cmd.extend(['-json', '-silent'])
             
             # 添加端口参数
             if self.ports:
-                scan_mode = self._determine_scan_mode(self.ports)
-                logger.debug(f"目标 {target} 扫描模式: {scan_mode}, 端口: {self.ports}")
+                scan_mode = self._scan_mode
+                logger.debug("目标 %s 扫描模式: %s, 端口: %s", target, scan_mode, self.ports)
                 if scan_mode == "custom":
                     cmd.extend(['-p', self._convert_ports_format(self.ports)])
                 else:
                     cmd.extend(['-tp', scan_mode])
             else:
                 cmd.extend(['-tp', '1000'])  # 默认扫描模式
-                logger.debug(f"目标 {target} 使用默认扫描模式: top1000")
+                logger.debug("目标 %s 使用默认扫描模式: top1000", target)
             
             # 添加并发数和速率
             cmd.extend(['-c', str(self.parallelism)])
@@ -369,66 +460,45 @@ class NaabuPortScan:
             if self.custom_host_timeout:
                 cmd.extend(['-timeout', f"{self.custom_host_timeout}s"])
             
-            logger.debug(f"执行单个目标扫描命令: {' '.join(cmd)}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("执行单个目标扫描命令: %s", ' '.join(cmd))
             
             # 计算单个目标的合理超时时间
-            scan_mode = self._determine_scan_mode(self.ports) if self.ports else "1000"
-            if scan_mode == "custom":
-                port_count = self._count_ports(self.ports)
-            elif scan_mode == "100":
-                port_count = 100
-            elif scan_mode == "1000":
-                port_count = 1000
-            elif scan_mode == "full":
-                port_count = 65535
-            else:
-                port_count = 1000
+            port_count = self._port_count
             
             # 单个目标超时时间：基础时间 + 端口数/速率 * 安全系数
             single_timeout = max(300, min(1800, int(120 + (port_count / self.rate) * 5 + 180)))
-            logger.debug(f"目标 {target} 设置超时时间: {single_timeout}秒 (端口数: {port_count})")
+            logger.debug("目标 %s 设置超时时间: %s秒 (端口数: %s)", target, single_timeout, port_count)
             
-            # 执行扫描
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=single_timeout)
+            # 执行扫描，边扫描边解析stdout中的结果行
+            returncode, parsed_results, timed_out, stderr = self._run_naabu(cmd, single_timeout)
             
-            logger.debug(f"目标 {target} naabu返回码: {result.returncode}")
+            logger.debug("目标 %s naabu返回码: %s", target, returncode)
             
-            if result.returncode != 0:
-                logger.warning(f"目标 {target} 扫描失败，返回码: {result.returncode}")
-                logger.debug(f"目标 {target} 错误输出: {result.stderr}")
-                return None
+            if timed_out:
+                logger.warning(f"目标 {target} 扫描超时")
+                # 保留超时前已经解析出的结果
+                return parsed_results[0] if parsed_results else None
             
-            # 等待结果文件生成
-            max_wait = 5
-            wait_count = 0
-            while not os.path.exists(temp_result_file) and wait_count < max_wait:
-                time.sleep(1)
-                wait_count += 1
-            
-            if not os.path.exists(temp_result_file):
-                logger.debug(f"目标 {target} 结果文件未生成，尝试解析stdout")
-                if result.stdout:
-                    parsed_results = self._parse_naabu_output(result.stdout)
-                    if parsed_results:
-                        return parsed_results[0]  # 返回第一个结果
+            if returncode != 0:
+                logger.warning(f"目标 {target} 扫描失败，返回码: {returncode}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("目标 %s 错误输出: %s", target, stderr.decode('utf-8', 'ignore'))
                 return None
             
-            # 读取结果文件
-            try:
-                with open(temp_result_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    if content.strip():
-                        parsed_results = self._parse_naabu_output(content)
-                        if parsed_results:
-                            return parsed_results[0]  # 返回第一个结果
+            # stdout中没有解析到结果时，再读取 -o 结果文件
+            if not parsed_results and self._has_result(temp_result_file):
+                logger.debug("目标 %s stdout中没有解析到结果，尝试读取结果文件", target)
+                try:
+                    parsed_results = self._parse_naabu_file(temp_result_file)
+                except Exception as e:
+                    logger.error(f"读取目标 {target} 结果文件失败: {str(e)}")
                     return None
-            except Exception as e:
-                logger.error(f"读取目标 {target} 结果文件失败: {str(e)}")
-                return None
-                
-        except subprocess.TimeoutExpired:
-            logger.warning(f"目标 {target} 扫描超时")
+            
+            if parsed_results:
+                return parsed_results[0]  # 返回第一个结果
             return None
+                
         except Exception as e:
             logger.error(f"扫描目标 {target} 时发生错误: {str(e)}")
             return None
@@ -453,23 +523,46 @@ class NaabuPortScan:
         if not ports_str:
             return 0
         
-        count = 0
-        parts = ports_str.split(',')
+        # 一次正则扫描完成统计，范围按 end - start + 1 计算
+        return sum(int(end) - int(start) + 1 if end else 1
+                   for start, end in PORT_RANGE_RE.findall(ports_str))
+
+    def _parse_naabu_file(self, result_file):
+        """
+        通过mmap逐行读取naabu的JSON结果文件，由内核按需换入页面，不把整个文件载入内存
         
-        for part in parts:
-            part = part.strip()
-            if '-' in part:
-                # 端口范围
-                try:
-                    start, end = part.split('-')
-                    count += int(end) - int(start) + 1
-                except:
-                    count += 1  # 解析失败时按1个端口计算
+        Args:
+            result_file: 结果文件路径
+            
+        Returns:
+            list: ARL格式的扫描结果列表
+        """
+        with open(result_file, 'rb') as f:
+            # 空文件无法映射
+            if os.fstat(f.fileno()).st_size == 0:
+                results = []
             else:
-                # 单个端口
-                count += 1
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    results = self._parse_naabu_lines(self._iter_mmap_lines(mm))
+        
+        if not results:
+            logger.warning("结果文件为空或没有开放端口")
         
-        return count
+        return results
+
+    @staticmethod
+    def _iter_mmap_lines(mm):
+        """
+        按换行符切分映射的文件内容，逐行返回 bytes
+        """
+        start = 0
+        size = len(mm)
+        while start < size:
+            end = mm.find(b'\n', start)
+            if end == -1:
+                end = size
+            yield mm[start:end]
+            start = end + 1
 
     def _parse_naabu_output(self, output):
         """
@@ -481,52 +574,63 @@ class NaabuPortScan:
         Returns:
             list: ARL格式的扫描结果列表
         """
-        logger.debug(f"开始解析naabu输出，长度: {len(output)} 字符")
+        logger.debug("开始解析naabu输出，长度: %s 字符", len(output))
+        return self._parse_naabu_lines(output.splitlines())
+
+    def _parse_naabu_lines(self, lines):
+        """
+        解析naabu的NDJSON输出，每行一个JSON对象
         
-        ip_info_dict = {}  # 使用字典按IP分组
+        Args:
+            lines: 可迭代的输出行，str 或 bytes
+            
+        Returns:
+            list: ARL格式的扫描结果列表
+        """
+        ip_info_dict = defaultdict(list)  # 使用字典按IP分组
+        # 日志级别在解析过程中不会变化，只判断一次
+        debug = logger.isEnabledFor(logging.DEBUG)
         
         try:
-            # naabu输出每行一个JSON对象
-            lines = output.strip().split('\n')
-            
             for line in lines:
                 line = line.strip()
-                if not line:
+                # 有效的结果行都以 { 开头，空行和日志行直接跳过，避免触发解析异常
+                if line[:1] not in JSON_LINE_PREFIXES:
                     continue
                 
                 try:
                     # 解析JSON行
-                    data = json.loads(line)
+                    data = json_loads(line)
                     
                     # 提取信息
                     host = data.get('host', '')
                     ip = data.get('ip', host)  # 如果没有ip字段，使用host
                     port = data.get('port', 0)
                     protocol = data.get('protocol', 'tcp')
+                    # 协议取值只有少数几种，驻留后所有端口共享同一个字符串对象
+                    if type(protocol) is str:
+                        protocol = sys.intern(protocol)
                     
                     if not ip or not port:
                         continue
                     
-                    # 按IP分组
-                    if ip not in ip_info_dict:
-                        ip_info_dict[ip] = []
+                    # naabu输出的端口通常是整数，字符串端口先检查是否为数字，不依赖异常处理
+                    if type(port) is not int:
+                        if not (isinstance(port, str) and port.isdigit()):
+                            continue
+                        port = int(port)
                     
-                    # 构建端口信息
-                    port_info = {
-                        'port_id': int(port),
-                        'service_name': '',  # naabu不提供服务名检测
-                        'version': '',
-                        'product': '',
-                        'protocol': protocol
-                    }
+                    # 解析阶段只记录 (端口, 协议)，返回前再统一构建端口信息
+                    ip_info_dict[ip].append((port, protocol))
                     
-                    ip_info_dict[ip].append(port_info)
-                    
-                except json.JSONDecodeError as e:
-                    logger.debug(f"跳过无效JSON行: {line[:100]}...")
+                except ValueError:
+                    # orjson.JSONDecodeError 与 json.JSONDecodeError 都是 ValueError 的子类
+                    if debug:
+                        logger.debug("跳过无效JSON行: %s...", line[:100])
                     continue
                 except Exception as e:
-                    logger.debug(f"解析JSON行时发生错误: {str(e)}, 行内容: {line[:100]}...")
+                    if debug:
+                        logger.debug("解析JSON行时发生错误: %s, 行内容: %s...", e, line[:100])
                     continue
         
         except Exception as e:
@@ -536,19 +640,29 @@ class NaabuPortScan:
         # 构建最终结果
         results = []
         for ip, ports in ip_info_dict.items():
-            logger.debug(f"主机 {ip} 有 {len(ports)} 个开放端口")
+            logger.debug("主机 %s 有 %s 个开放端口", ip, len(ports))
+            
+            port_info_list = [
+                {
+                    'port_id': port,
+                    'service_name': '',  # naabu不提供服务名检测
+                    'version': '',
+                    'product': '',
+                    'protocol': protocol
+                }
+                for port, protocol in ports
+            ]
             
             result = {
                 'ip': ip,
-                'port_info': ports,
+                'port_info': port_info_list,
                 'os_info': {}  # naabu不提供OS检测
             }
             results.append(result)
         
-        logger.debug(f"解析完成，返回 {len(results)} 个主机结果")
+        logger.debug("解析完成，返回 %s 个主机结果", len(results))
         return results
 
-
 def port_scan(targets, ports=Config.TOP_10, service_detect=False, os_detect=False,
               port_parallelism=25, port_min_rate=1000, custom_host_timeout=None, port_scan_type=None):
     """
@@ -569,8 +683,7 @@ def port_scan(targets, ports=Config.TOP_10, service_detect=False, os_detect=Fals
         list: 扫描结果列表
     """
     # 过滤目标列表
-    targets = list(set(targets))
-    targets = list(filter(utils.not_in_black_ips, targets))
+    targets = [target for target in set(targets) if utils.not_in_black_ips(target)]
     
     if not targets:
         logger.warning("没有有效的扫描目标")
@@ -1,13 +1,74 @@
 import json
 import os
-import subprocess
+import shutil
+import asyncio
+import logging
+import platform
+import functools
 
 from app.config import Config
 from app import utils
 
+try:
+    # ijson 增量解析 JSON 数组格式的结果文件
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    # orjson 直接解析 bytes，比标准库快数倍
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 logger = utils.get_logger()
 
+# vscanPlus 单次扫描的最长时间
+NUCLEI_TIMEOUT = 96 * 60 * 60
+
+PLATFORM_SYSTEM = platform.system()
+
+# 启动时查找一次 bash，避免每次扫描都启动子进程探测
+BASH_PATH = shutil.which("bash")
+
+
+@functools.lru_cache(maxsize=32)
+def classify_executable(path, mtime):
+    """
+    读取文件头部判断文件类型，按 (路径, 修改时间) 缓存，文件未变化时不再重复读取
+    
+    Args:
+        path: 文件路径
+        mtime: 文件修改时间
+        
+    Returns:
+        tuple: (是否为二进制可执行文件, 是否为脚本文件)
+    """
+    try:
+        # 只打开一次，文件头和 shebang 都从同一段字节中判断
+        with open(path, 'rb') as f:
+            header = f.read(256)
+        
+        # 检查是否为二进制可执行文件
+        is_binary = False
+        if PLATFORM_SYSTEM == "Linux":
+            # Linux ELF文件头
+            is_binary = header.startswith(b'\x7fELF')
+        elif PLATFORM_SYSTEM == "Windows":
+            # Windows PE文件头
+            is_binary = header.startswith(b'MZ')
+        
+        # 如果不是二进制文件，检查是否为脚本文件
+        is_script = not is_binary and header.lstrip().startswith(b'#!')
+            
+    except Exception as e:
+        logger.warning("无法读取vscanPlus文件头: %s", e)
+        is_binary = False
+        is_script = False
+    
+    return is_binary, is_script
+
 
 class NucleiScan(object):
     def __init__(self, targets: list):
@@ -25,6 +86,9 @@ class NucleiScan(object):
         self.vscan_result_path = os.path.join(tmp_path,
                                                "vscan_result_{}.json".format(rand_str))
 
+        # 本次扫描产生的所有临时文件，新增临时文件时加到这里即可被清理
+        self.temp_files = (self.nuclei_target_path, self.nuclei_result_path, self.vscan_result_path)
+
         self.nuclei_bin_path = "nuclei"
 
         self.vscan_bin_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tools", "vscanPlus")
@@ -36,28 +100,25 @@ class NucleiScan(object):
         """
         删除临时文件
         """
-        files_to_delete = [self.nuclei_target_path, self.nuclei_result_path, self.vscan_result_path]
-        
-        for file_path in files_to_delete:
-            if os.path.exists(file_path):
-                try:
-                    os.remove(file_path)
-                    logger.info(f"已删除临时文件: {file_path}")
-                except Exception as e:
-                    logger.warning(f"删除临时文件失败 {file_path}: {e}")
-            else:
-                logger.debug(f"临时文件不存在，无需删除: {file_path}")
+        for file_path in self.temp_files:
+            # 直接删除，文件不存在时忽略，省去一次 stat
+            try:
+                os.unlink(file_path)
+                logger.info("已删除临时文件: %s", file_path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning("删除临时文件失败 %s: %s", file_path, e)
 
     def _gen_target_file(self):
         """
         生成目标文件
         """
-        with open(self.nuclei_target_path, "w") as f:
-            for domain in self.targets:
-                domain = domain.strip()
-                if not domain:
-                    continue
-                f.write(domain + "\n")
+        data = "\n".join(d for d in (x.strip() for x in self.targets) if d)
+        # 一次性写入，使用较大的缓冲区减少刷写次数
+        with open(self.nuclei_target_path, "w", buffering=1 << 16) as f:
+            f.write(data)
+            f.write("\n")
 
     def dump_result(self, result_file=None):
         """
@@ -71,57 +132,92 @@ class NucleiScan(object):
             result_file = self.vscan_result_path
             
         if not os.path.exists(result_file):
-            logger.warning(f"结果文件不存在: {result_file}")
+            logger.warning("结果文件不存在: %s", result_file)
             return []
         
         if os.path.getsize(result_file) == 0:
-            logger.warning(f"结果文件为空: {result_file}")
+            logger.warning("结果文件为空: %s", result_file)
             return []
         
         results = []
         
         try:
-            with open(result_file, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-                
-            if not content:
-                logger.warning(f"结果文件内容为空: {result_file}")
-                return []
-            
-            # 记录原始输出用于调试
-            logger.info(f"vscanPlus 原始输出: {content[:200]}...")
-            
-            # 尝试解析为单个 JSON 对象（真实的 vscanPlus 输出格式）
-            try:
-                data = json.loads(content)
-                logger.info("成功解析 vscanPlus JSON 输出")
-                parsed_results = self._parse_real_vscanplus_result(data)
-                results.extend(parsed_results)
-                        
-            except json.JSONDecodeError as e:
-                logger.error(f"解析 vscanPlus JSON 输出失败: {e}")
-                # 尝试逐行解析作为备用方案
-                logger.info("尝试逐行解析作为备用方案")
-                for line in content.split('\n'):
-                    line = line.strip()
-                    if not line:
-                        continue
-                    
-                    try:
-                        data = json.loads(line)
-                        parsed_results = self._parse_real_vscanplus_result(data)
-                        results.extend(parsed_results)
-                    except json.JSONDecodeError as line_e:
-                        logger.warning(f"解析 JSON 行失败: {line[:100]}..., 错误: {line_e}")
-                        continue
+            with open(result_file, 'rb') as f:
+                for data in self._iter_result_records(f):
+                    parsed_results = self._parse_real_vscanplus_result(data)
+                    results.extend(parsed_results)
                         
         except Exception as e:
-            logger.error(f"读取结果文件失败: {result_file}, 错误: {e}")
+            logger.error("读取结果文件失败: %s, 错误: %s", result_file, e)
             return []
         
-        logger.info(f"成功解析 {len(results)} 个扫描结果")
+        logger.info("成功解析 %s 个扫描结果", len(results))
         return results
     
+    def _iter_result_records(self, f):
+        """
+        逐条读取 vscanPlus 结果记录，按行解析，不把整个文件载入内存
+        兼容单个 JSON 对象、JSON 数组和每行一个 JSON 对象三种格式
+        
+        Args:
+            f: 以二进制模式打开的结果文件
+        """
+        first_line = b''
+        for first_line in f:
+            first_line = first_line.strip()
+            if first_line:
+                break
+        
+        if not first_line:
+            logger.warning("结果文件内容为空")
+            return
+        
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("vscanPlus 原始输出: %s...", first_line[:200])
+        
+        # JSON 数组，有 ijson 时逐个读取数组元素
+        if first_line.startswith(b'['):
+            f.seek(0)
+            if ijson is not None:
+                yield from ijson.items(f, 'item')
+            else:
+                yield from json_loads(f.read())
+            return
+        
+        try:
+            data = json_loads(first_line)
+        except ValueError as e:
+            # 第一行不是完整的 JSON，可能是跨多行的单个 JSON 对象
+            f.seek(0)
+            try:
+                data = json_loads(f.read())
+            except ValueError:
+                # 也不是单个对象，说明是第一行损坏的逐行输出，跳过该行继续按行解析
+                logger.warning("解析 JSON 行失败: %s..., 错误: %s", first_line[:100], e)
+                f.seek(0)
+                for line in f:
+                    if line.strip():
+                        break
+            else:
+                if isinstance(data, list):
+                    yield from data
+                else:
+                    yield data
+                return
+        else:
+            yield data
+        
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                yield json_loads(line)
+            except ValueError as e:
+                logger.warning("解析 JSON 行失败: %s..., 错误: %s", line[:100], e)
+                continue
+    
     def _parse_real_vscanplus_result(self, data):
         """
         解析真实的vscanPlus扫描结果
@@ -149,117 +245,85 @@ class NucleiScan(object):
             if not isinstance(poc_list, list):
                 poc_list = []
             
-            logger.info("目标: {}, 技术栈: {}, POC: {}".format(target, technologies, poc_list))
+            logger.info("目标: %s, 技术栈: %s, POC: %s", target, technologies, poc_list)
+            
+            # 同一目标的公共字段只构建一次
+            base = {
+                "template_url": target,
+                "vuln_url": target,
+                "curl_command": "curl -X GET '{}'".format(target),
+                "target": target
+            }
+            title_suffix = " (标题: {})".format(title) if title else ""
             
             # 处理技术栈检测结果
             if technologies:
-                tech_result = {
-                    "template_url": target,
+                results.append({
+                    **base,
                     "template_id": "tech_detection",
-                    "vuln_name": "技术栈检测: {}".format(', '.join(technologies)),
-                    "vuln_severity": "info",
-                    "vuln_url": target,
-                    "curl_command": "curl -X GET '{}'".format(target),
-                    "target": target
-                }
-                if title:
-                    tech_result["vuln_name"] += " (标题: {})".format(title)
-                results.append(tech_result)
+                    "vuln_name": "技术栈检测: {}{}".format(', '.join(technologies), title_suffix),
+                    "vuln_severity": "info"
+                })
             
             # 处理POC检测结果
-            if poc_list:
-                for poc in poc_list:
-                    poc_result = {
-                        "template_url": target,
-                        "template_id": "poc_detection",
-                        "vuln_name": "POC检测: {}".format(poc),
-                        "vuln_severity": "medium",
-                        "vuln_url": target,
-                        "curl_command": "curl -X GET '{}'".format(target),
-                        "target": target
-                    }
-                    results.append(poc_result)
+            results.extend([{
+                **base,
+                "template_id": "poc_detection",
+                "vuln_name": "POC检测: {}".format(poc),
+                "vuln_severity": "medium"
+            } for poc in poc_list])
             
             # 如果既没有技术栈也没有POC，创建一个基础记录
             if not technologies and not poc_list:
-                basic_result = {
-                    "template_url": target,
+                results.append({
+                    **base,
                     "template_id": "basic_scan",
-                    "vuln_name": "基础扫描完成",
-                    "vuln_severity": "info",
-                    "vuln_url": target,
-                    "curl_command": "curl -X GET '{}'".format(target),
-                    "target": target
-                }
-                if title:
-                    basic_result["vuln_name"] += " (标题: {})".format(title)
-                results.append(basic_result)
+                    "vuln_name": "基础扫描完成" + title_suffix,
+                    "vuln_severity": "info"
+                })
             
         except Exception as e:
-            logger.error("解析vscanPlus结果失败: {}".format(str(e)))
+            logger.error("解析vscanPlus结果失败: %s", e)
         
         return results
 
-    def exec_nuclei(self):
+    def _build_command(self):
         """
-        执行vscanPlus扫描
+        生成目标文件并构建vscanPlus命令
+        
+        Returns:
+            list: 命令参数列表，目标文件为空时返回None
         """
         # 生成目标文件
         self._gen_target_file()
         
         # 检查目标文件是否生成成功
         if not os.path.exists(self.nuclei_target_path):
-            logger.error(f"目标文件生成失败: {self.nuclei_target_path}")
-            return
+            logger.error("目标文件生成失败: %s", self.nuclei_target_path)
+            return None
             
         # 检查目标文件内容
         try:
             with open(self.nuclei_target_path, 'r', encoding='utf-8') as f:
                 target_content = f.read().strip()
             if not target_content:
-                logger.warning(f"目标文件为空: {self.nuclei_target_path}")
-                return
-            logger.info(f"目标文件内容: {target_content}")
+                logger.warning("目标文件为空: %s", self.nuclei_target_path)
+                return None
+            logger.info("目标文件内容: %s", target_content)
         except Exception as e:
-            logger.error(f"读取目标文件失败: {e}")
-            return
+            logger.error("读取目标文件失败: %s", e)
+            return None
 
         logger.info("开始执行vscanPlus扫描")
 
         # 检查vscanPlus文件类型并选择合适的执行方式
-        import stat
-        import platform
-        
-        # 检查文件是否存在
-        if not os.path.exists(self.vscan_bin_path):
+        # 检查文件是否存在，同时取得修改时间用于缓存文件类型
+        try:
+            mtime = os.path.getmtime(self.vscan_bin_path)
+        except OSError:
             raise FileNotFoundError(f"vscanPlus工具不存在: {self.vscan_bin_path}")
         
-        # 读取文件头部判断文件类型
-        try:
-            with open(self.vscan_bin_path, 'rb') as f:
-                header = f.read(4)
-            
-            # 检查是否为二进制可执行文件
-            is_binary = False
-            if platform.system() == "Linux":
-                # Linux ELF文件头
-                is_binary = header.startswith(b'\x7fELF')
-            elif platform.system() == "Windows":
-                # Windows PE文件头
-                is_binary = header.startswith(b'MZ')
-            
-            # 如果不是二进制文件，检查是否为脚本文件
-            if not is_binary:
-                with open(self.vscan_bin_path, 'r', encoding='utf-8') as f:
-                    first_line = f.readline().strip()
-                    is_script = first_line.startswith('#!')
-            else:
-                is_script = False
-                
-        except Exception as e:
-            logger.warning(f"无法读取vscanPlus文件头: {e}")
-            is_binary = False
-            is_script = False
+        is_binary, is_script = classify_executable(self.vscan_bin_path, mtime)
         
         # 根据文件类型和权限选择执行方式
         if is_binary and os.access(self.vscan_bin_path, os.X_OK):
@@ -272,20 +336,18 @@ class NucleiScan(object):
             ]
         elif is_script:
             # 执行脚本文件
-            if platform.system() == "Windows":
+            if PLATFORM_SYSTEM == "Windows":
                 # Windows下，如果没有bash，则使用python执行
-                try:
-                    import subprocess
-                    subprocess.run(['bash', '--version'], capture_output=True, check=True)
+                if BASH_PATH:
                     # bash可用，使用bash执行
                     command = [
-                        "bash",
+                        BASH_PATH,
                         self.vscan_bin_path,
                         "-l", self.nuclei_target_path,
                         "-json",
                         "-o", self.vscan_result_path
                     ]
-                except (subprocess.CalledProcessError, FileNotFoundError):
+                else:
                     # bash不可用，使用python执行
                     command = [
                         "python",
@@ -304,7 +366,7 @@ class NucleiScan(object):
                 ]
         else:
             # 尝试用python执行
-            python_cmd = "python3" if platform.system() != "Windows" else "python"
+            python_cmd = "python3" if PLATFORM_SYSTEM != "Windows" else "python"
             command = [
                 python_cmd,
                 self.vscan_bin_path,
@@ -313,40 +375,106 @@ class NucleiScan(object):
                 "-o", self.vscan_result_path
             ]
 
-        logger.info("vscanPlus命令: {}".format(" ".join(command)))
+        logger.info("vscanPlus命令: %s", " ".join(command))
+        return command
 
-        try:
-            # 执行命令
-            result = utils.exec_system(command, timeout=96*60*60)
-            logger.info(f"vscanPlus执行完成，返回码: {result}")
+    def _check_result_file(self):
+        """
+        检查结果文件是否生成
+        """
+        if os.path.exists(self.vscan_result_path):
+            file_size = os.path.getsize(self.vscan_result_path)
+            logger.info("结果文件已生成: %s, 大小: %s 字节", self.vscan_result_path, file_size)
             
-            # 检查结果文件是否生成
-            if os.path.exists(self.vscan_result_path):
-                file_size = os.path.getsize(self.vscan_result_path)
-                logger.info(f"结果文件已生成: {self.vscan_result_path}, 大小: {file_size} 字节")
-                
-                # 如果文件不为空，记录前几行内容用于调试
-                if file_size > 0:
-                    try:
-                        with open(self.vscan_result_path, 'r', encoding='utf-8') as f:
-                            preview = f.read(500)
-                        logger.info(f"结果文件预览: {preview}")
-                    except Exception as e:
-                        logger.warning(f"读取结果文件预览失败: {e}")
-                else:
-                    logger.warning(f"结果文件为空: {self.vscan_result_path}")
+            # 如果文件不为空，记录前几行内容用于调试
+            if file_size > 0:
+                try:
+                    with open(self.vscan_result_path, 'r', encoding='utf-8') as f:
+                        preview = f.read(500)
+                    logger.info("结果文件预览: %s", preview)
+                except Exception as e:
+                    logger.warning("读取结果文件预览失败: %s", e)
             else:
-                logger.error(f"结果文件未生成: {self.vscan_result_path}")
-                
+                logger.warning("结果文件为空: %s", self.vscan_result_path)
+        else:
+            logger.error("结果文件未生成: %s", self.vscan_result_path)
+
+    def exec_nuclei(self):
+        """
+        执行vscanPlus扫描
+        """
+        command = self._build_command()
+        if command is None:
+            return
+
+        try:
+            # 执行命令
+            result = utils.exec_system(command, timeout=NUCLEI_TIMEOUT)
+            logger.info("vscanPlus执行完成，返回码: %s", result)
+            self._check_result_file()
         except Exception as e:
-            logger.error(f"执行vscanPlus失败: {e}")
+            logger.error("执行vscanPlus失败: %s", e)
             raise
 
+    async def exec_nuclei_async(self):
+        """
+        以异步子进程执行vscanPlus扫描，等待期间不阻塞事件循环，
+        同一进程中的多个扫描可以并发等待
+        """
+        command = self._build_command()
+        if command is None:
+            return
+
+        try:
+            proc = await asyncio.create_subprocess_exec(*command, close_fds=True)
+            try:
+                returncode = await asyncio.wait_for(proc.wait(), timeout=NUCLEI_TIMEOUT)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+                raise
+
+            logger.info("vscanPlus执行完成，返回码: %s", returncode)
+            self._check_result_file()
+        except Exception as e:
+            logger.error("执行vscanPlus失败: %s", e)
+            raise
+
+    async def run_async(self):
+        """
+        执行nuclei扫描的协程版本，结果解析放到线程池中执行
+        """
+        logger.info("开始nuclei扫描，目标数量: %s", len(self.targets))
+
+        try:
+            await self.exec_nuclei_async()
+
+            loop = asyncio.get_running_loop()
+            results = await loop.run_in_executor(None, self.dump_result)
+            logger.info("nuclei扫描完成，获得结果数量: %s", len(results))
+
+            return results
+
+        except Exception as e:
+            logger.error("nuclei扫描过程中发生错误: %s", e)
+            return []
+
+        finally:
+            try:
+                self._delete_file()
+            except Exception as e:
+                logger.warning("清理临时文件时发生错误: %s", e)
+
     def run(self):
         """
         执行nuclei扫描的主方法
         """
-        logger.info(f"开始nuclei扫描，目标数量: {len(self.targets)}")
+        if utils.can_run_async_subprocess():
+            # 以异步子进程方式执行
+            return asyncio.run(self.run_async())
+
+        # 已经处于事件循环中或不能挂载子进程 watcher 的线程中，使用同步方式执行
+        logger.info("开始nuclei扫描，目标数量: %s", len(self.targets))
         
         try:
             # 执行vscanPlus扫描
@@ -354,12 +482,12 @@ class NucleiScan(object):
             
             # 解析扫描结果
             results = self.dump_result()
-            logger.info(f"nuclei扫描完成，获得结果数量: {len(results)}")
+            logger.info("nuclei扫描完成，获得结果数量: %s", len(results))
             
             return results
             
         except Exception as e:
-            logger.error(f"nuclei扫描过程中发生错误: {e}")
+            logger.error("nuclei扫描过程中发生错误: %s", e)
             return []
             
         finally:
@@ -367,7 +495,7 @@ class NucleiScan(object):
             try:
                 self._delete_file()
             except Exception as e:
-                logger.warning(f"清理临时文件时发生错误: {e}")
+                logger.warning("清理临时文件时发生错误: %s", e)
 
 
 def nuclei_scan(targets: list):
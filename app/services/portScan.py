@@ -59,8 +59,7 @@ class PortScan:
         Returns:
             list: 扫描结果列表
         """
-        logger.info("使用naabu进行端口扫描，目标: {}，端口: {}".format(
-            str(self.targets)[:50], str(self.ports)[:50]))
+        logger.info("使用naabu进行端口扫描，目标数量: %s，端口: %s", len(self.targets), self.ports)
         
         return self.scanner.run()
 
@@ -102,8 +101,7 @@ def port_scan(targets, ports=Config.TOP_10, service_detect=False, os_detect=Fals
         list: 扫描结果列表，格式与原nmap兼容
     """
     # 过滤目标列表，去重并过滤黑名单IP
-    targets = list(set(targets))
-    targets = list(filter(utils.not_in_black_ips, targets))
+    targets = [target for target in set(targets) if utils.not_in_black_ips(target)]
     
     if not targets:
         logger.warning("没有有效的扫描目标")
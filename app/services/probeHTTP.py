@@ -1,5 +1,13 @@
 import time
+import threading
+from queue import Queue, Empty
+
+import requests
+from requests.adapters import HTTPAdapter
+
 from app import utils
+from app.config import Config
+from app.utils.conn import UA
 from .baseThread import BaseThread
 logger = utils.get_logger()
 
@@ -10,8 +18,12 @@ class ProbeHTTP(BaseThread):
 
         self.sites = []
         self.domains = domains
+        self.session = self._build_session()
 
     def _build_targets(self, domains):
+        """
+        先只探测 https，https 不存活的再用 http 探测
+        """
         _targets = []
         for item in domains:
             domain = item
@@ -19,43 +31,104 @@ class ProbeHTTP(BaseThread):
                 domain = item.domain
 
             _targets.append("https://{}".format(domain))
-            _targets.append("http://{}".format(domain))
 
         return _targets
 
+    def _build_session(self):
+        """
+        构建复用连接池的 Session，同一主机的 http/https 探测复用连接
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=self.concurrency,
+                              pool_maxsize=self.concurrency * 2, max_retries=0)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        session.verify = False
+        session.headers.update({
+            "User-Agent": UA,
+            # 不允许缓存
+            "Cache-Control": "max-age=0"
+        })
+
+        if Config.PROXY_URL:
+            session.proxies = {
+                "https": Config.PROXY_URL,
+                "http": Config.PROXY_URL
+            }
+
+        return session
+
     def work(self, target):
         """
         检查域名是否存活
         只要能获得HTTP响应就认为存活，不过度过滤状态码
         """
-        conn = utils.http_req(target, 'get', timeout=(3, 2), stream=True)
-        conn.close()
+        with self.session.get(target, timeout=(3, 2), stream=True, allow_redirects=False) as conn:
+            status_code = conn.status_code
 
         # 只过滤明确的网络错误状态码，保留大部分响应
         # 502, 504: 网关错误，通常表示后端服务不可用
-        if conn.status_code in [502, 504]:
-            logger.debug(f"{target} 状态码为 {conn.status_code} 跳过")
+        if status_code in [502, 504]:
+            logger.debug("%s 状态码为 %s 跳过", target, status_code)
             return
 
         self.sites.append(target)
 
+    def _consume(self, queue):
+        while True:
+            try:
+                target = queue.get_nowait()
+            except Empty:
+                return
+
+            try:
+                self.work(target)
+            except requests.exceptions.RequestException:
+                pass
+            except Exception as e:
+                logger.warning("error on %s: %r", target, e)
+
+    def _run(self, targets=None):
+        """
+        使用固定数量的工作线程消费目标队列，避免每个目标创建一个线程
+        """
+        if targets is None:
+            targets = self.targets
+
+        queue = Queue()
+        for target in targets:
+            target = target.strip()
+            if target:
+                queue.put(target)
+
+        workers = []
+        for _ in range(min(self.concurrency, queue.qsize())):
+            t = threading.Thread(target=self._consume, args=(queue,), daemon=True)
+            t.start()
+            workers.append(t)
+
+        for t in workers:
+            t.join()
+
     def run(self):
         t1 = time.time()
-        logger.info("start ProbeHTTP {}".format(len(self.targets)))
-        self._run()
-        # 去除https和http相同的
-        alive_site = []
-        for x in self.sites:
-            if x.startswith("https://"):
-                alive_site.append(x)
-
-            elif x.startswith("http://"):
-                x_temp = "https://" + x[7:]
-                if x_temp not in self.sites:
-                    alive_site.append(x)
+        logger.info("start ProbeHTTP %s", len(self.targets))
+        try:
+            self._run()
+
+            # https 存活的不再探测 http，避免同一站点重复请求
+            alive_https = set(self.sites)
+            http_targets = ["http://" + x[8:] for x in self.targets
+                            if x not in alive_https]
+            self._run(http_targets)
+        finally:
+            self.session.close()
+
+        alive_site = self.sites
 
         elapse = time.time() - t1
-        logger.info("end ProbeHTTP {} elapse {}".format(len(alive_site), elapse))
+        logger.info("end ProbeHTTP %s elapse %s", len(alive_site), elapse)
 
         return alive_site
 
@@ -1,23 +1,84 @@
 import time
 import json
+import asyncio
+import threading
 from app import utils
 from app.config import Config
 from .baseThread import BaseThread
+
+try:
+    # orjson 直接解析 bytes，比标准库快数倍
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+try:
+    # 安装了 python-Wappalyzer 时在进程内识别指纹，不再为每个站点启动 PhantomJS
+    from Wappalyzer import Wappalyzer, WebPage
+except ImportError:
+    Wappalyzer = None
+
+# 是否在进程内识别，此时可以直接复用已抓取的页面
+IN_PROCESS_ANALYZE = Wappalyzer is not None
+
 logger = utils.get_logger()
 
 
 class WebAnalyze(BaseThread):
-    def __init__(self, sites, concurrency=3):
+    # 指纹规则加载较慢，进程内只加载一次
+    _wappalyzer = None
+    _wappalyzer_lock = threading.Lock()
+
+    def __init__(self, sites, concurrency=3, page_map=None):
         super().__init__(sites, concurrency = concurrency)
         self.analyze_map = {}
+        # 站点 => (响应头, 页面内容)，来自 fetch_site，命中时不再重复请求
+        self.page_map = page_map or {}
 
-    def work(self, site):
+    @classmethod
+    def get_wappalyzer(cls):
+        if cls._wappalyzer is None:
+            with cls._wappalyzer_lock:
+                if cls._wappalyzer is None:
+                    cls._wappalyzer = Wappalyzer.latest()
+
+        return cls._wappalyzer
+
+    def _work_in_process(self, site):
         """
-        分析网站的技术栈信息
-        
-        Args:
-            site (str): 要分析的网站URL
+        使用 Wappalyzer 在进程内分析网站的技术栈信息
         """
+        try:
+            page = self.page_map.get(site)
+            if page is not None:
+                page = WebPage(site, page[1], page[0])
+            else:
+                page = WebPage.new_from_url(site, verify=False, timeout=10)
+            wappalyzer = self.get_wappalyzer()
+            techs = wappalyzer.analyze_with_versions_and_categories(page)
+        except Exception as e:
+            logger.error("Wappalyzer analyze failed for {}: {}".format(site, str(e)))
+            self.analyze_map[site] = []
+            return
+
+        # 与 PhantomJS 输出的字段保持一致
+        applications = []
+        for name, info in techs.items():
+            versions = info.get("versions") or [""]
+            tech = wappalyzer.technologies.get(name) or {}
+            applications.append({
+                "name": name,
+                "confidence": "100",
+                "version": versions[0],
+                "icon": tech.get("icon") or "default.svg",
+                "website": tech.get("website", ""),
+                "categories": info.get("categories") or []
+            })
+
+        self.analyze_map[site] = applications
+
+    def _build_cmd(self, site):
         cmd_parameters = [Config.PHANTOMJS_BIN,
                           '--ignore-ssl-errors=true',
                           '--ssl-protocol=any',
@@ -26,47 +87,104 @@ class WebAnalyze(BaseThread):
                           site
                           ]
         logger.debug("WebAnalyze=> {}".format(" ".join(cmd_parameters)))
+        return cmd_parameters
 
+    def _parse_output(self, site, output):
+        """
+        解析 PhantomJS 输出，写入 analyze_map
+        """
+        # 记录原始输出用于调试
+        logger.debug("PhantomJS output for %s: %r", site, output)
+
+        # 检查输出是否为空
+        if not output:
+            logger.warning("PhantomJS returned empty output for {}".format(site))
+            self.analyze_map[site] = []
+            return
+
+        # 尝试解析JSON
         try:
-            output = utils.check_output(cmd_parameters, timeout=20)
-            output = output.decode('utf-8').strip()
-            
-            # 记录原始输出用于调试
-            logger.debug("PhantomJS output for {}: {}".format(site, output))
-            
-            # 检查输出是否为空
-            if not output:
-                logger.warning("PhantomJS returned empty output for {}".format(site))
-                self.analyze_map[site] = []
-                return
-            
-            # 尝试解析JSON
-            try:
-                json_data = json.loads(output)
-                if isinstance(json_data, dict) and "applications" in json_data:
-                    self.analyze_map[site] = json_data["applications"]
-                else:
-                    logger.warning("Invalid JSON structure for {}: missing 'applications' field".format(site))
-                    self.analyze_map[site] = []
-            except json.JSONDecodeError as e:
-                logger.error("JSON decode error for {}: {}. Raw output: {}".format(site, str(e), repr(output)))
+            json_data = json_loads(output)
+            if isinstance(json_data, dict) and "applications" in json_data:
+                self.analyze_map[site] = json_data["applications"]
+            else:
+                logger.warning("Invalid JSON structure for {}: missing 'applications' field".format(site))
                 self.analyze_map[site] = []
+        except ValueError as e:
+            # orjson.JSONDecodeError 与 json.JSONDecodeError 都是 ValueError 的子类
+            logger.error("JSON decode error for {}: {}. Raw output: {}".format(site, str(e), repr(output)))
+            self.analyze_map[site] = []
+
+    def work(self, site):
+        """
+        分析网站的技术栈信息
+        
+        Args:
+            site (str): 要分析的网站URL
+        """
+        if Wappalyzer is not None:
+            self._work_in_process(site)
+            return
+
+        cmd_parameters = self._build_cmd(site)
+
+        try:
+            # 输出保持为 bytes，直接交给 JSON 解析，不再先解码
+            output = utils.check_output(cmd_parameters, timeout=20).strip()
+            self._parse_output(site, output)
                 
         except Exception as e:
             logger.error("PhantomJS execution failed for {}: {}".format(site, str(e)))
             self.analyze_map[site] = []
 
+    async def work_async(self, site, semaphore):
+        """
+        以异步子进程运行 PhantomJS，由信号量限制同时运行的进程数
+        每个协程只写入自己站点对应的 key
+        """
+        cmd_parameters = self._build_cmd(site)
+
+        async with semaphore:
+            try:
+                proc = await asyncio.create_subprocess_exec(*cmd_parameters,
+                                                            stdout=asyncio.subprocess.PIPE,
+                                                            stderr=asyncio.subprocess.DEVNULL)
+                try:
+                    output, _ = await asyncio.wait_for(proc.communicate(), timeout=20)
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+                    logger.error("PhantomJS timeout for {}".format(site))
+                    self.analyze_map[site] = []
+                    return
+
+                self._parse_output(site, output.strip())
+
+            except Exception as e:
+                logger.error("PhantomJS execution failed for {}: {}".format(site, str(e)))
+                self.analyze_map[site] = []
+
+    async def _run_async(self):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        sites = [site.strip() for site in self.targets if site.strip()]
+        await asyncio.gather(*[self.work_async(site, semaphore) for site in sites])
+
     def run(self):
         t1 = time.time()
         logger.info("start WebAnalyze {}".format(len(self.targets)))
-        self._run()
+        if Wappalyzer is None and utils.can_run_async_subprocess():
+            # PhantomJS 以异步子进程并发执行
+            asyncio.run(self._run_async())
+        else:
+            # 进程内识别，或在 Flask 请求线程等不能使用异步子进程的线程中，使用线程池
+            self._run()
         elapse = time.time() - t1
         logger.info("end WebAnalyze elapse {}".format(elapse))
         return self.analyze_map
 
 
-def web_analyze(sites, concurrency=3):
-    s = WebAnalyze(sites, concurrency=concurrency)
+def web_analyze(sites, concurrency=3, page_map=None):
+    s = WebAnalyze(sites, concurrency=concurrency, page_map=page_map)
     return s.run()
 
 
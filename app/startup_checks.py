@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+独立部署启动脚本共用的配置加载和外部依赖检查
+"""
+
+import os
+import sys
+import time
+import hashlib
+import tempfile
+import multiprocessing
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+from app.config_cache import load_yaml_config, get_cache_file, private_cache_dir
+
+
+def load_config(config_file):
+    """
+    加载配置文件
+    
+    Args:
+        config_file (str): 配置文件路径
+        
+    Returns:
+        dict: 配置字典
+    """
+    try:
+        config = load_yaml_config(config_file)
+        # 子进程只通过环境变量拿到缓存文件路径，由 app/config.py 读取已解析的结果
+        cache_file = get_cache_file(config_file)
+        if cache_file:
+            os.environ['ARL_CONFIG_CACHE'] = cache_file
+        return config
+    except Exception as e:
+        print(f"加载配置文件失败: {e}")
+        sys.exit(1)
+
+
+def _probe_mongo(config):
+    """
+    检查MongoDB连接
+
+    Returns:
+        tuple: (名称, 是否正常, 错误信息)
+    """
+    try:
+        from pymongo import MongoClient
+        mongo_uri = config.get('MONGO', {}).get('URI', 'mongodb://localhost:27017/')
+        # 探测使用较短的超时，配置错误时尽快返回，应用运行时使用各自的连接
+        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=1500,
+                             connectTimeoutMS=1500, socketTimeoutMS=2000)
+        try:
+            client.server_info()
+        finally:
+            client.close()
+        return 'MongoDB', True, ''
+    except Exception as e:
+        return 'MongoDB', False, str(e)
+
+
+def _probe_rabbit(config):
+    """
+    检查RabbitMQ连接
+
+    Returns:
+        tuple: (名称, 是否正常, 错误信息)
+    """
+    try:
+        import pika
+        broker_url = config.get('CELERY', {}).get('BROKER_URL', '')
+        if broker_url.startswith('amqp://'):
+            # 解析RabbitMQ连接参数
+            parsed = urlparse(broker_url)
+            credentials = pika.PlainCredentials(parsed.username, parsed.password)
+            parameters = pika.ConnectionParameters(
+                host=parsed.hostname,
+                port=parsed.port or 5672,
+                virtual_host=parsed.path[1:] if parsed.path else '/',
+                credentials=credentials,
+                # 只用于连通性检查，Broker 不可用时尽快失败
+                heartbeat=0,
+                socket_timeout=1.5,
+                connection_attempts=1,
+                blocked_connection_timeout=1.5
+            )
+            connection = pika.BlockingConnection(parameters)
+            connection.close()
+        return 'RabbitMQ', True, ''
+    except Exception as e:
+        return 'RabbitMQ', False, str(e)
+
+
+def check_dependencies(config):
+    """
+    检查外部依赖连接，各项检查并行执行
+    
+    Args:
+        config (dict): 配置字典
+    """
+    print("正在检查外部依赖连接...")
+
+    ok = True
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(_probe_mongo, config), executor.submit(_probe_rabbit, config)]
+        for future in as_completed(futures):
+            name, success, msg = future.result()
+            if success:
+                print(f"✓ {name}连接正常")
+            else:
+                print(f"✗ {name}连接失败: {msg}")
+                print(f"请确保{name}服务已启动并且连接配置正确")
+                ok = False
+    
+    return ok
+
+
+def check_dependencies_isolated(config):
+    """
+    在独立的 spawn 子进程中检查外部依赖，检查时建立的 MongoDB/RabbitMQ 连接
+    随子进程一起释放，不会被之后 fork 出的 Worker 进程继承
+    
+    Args:
+        config (dict): 配置字典
+    """
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as executor:
+        return executor.submit(check_dependencies, config).result()
+
+
+# 依赖检查通过后的有效期（秒），有效期内重复启动不再检查
+DEPENDENCY_CHECK_TTL = 30
+
+
+def _dependency_check_marker(config):
+    """
+    依赖检查通过的标记文件，按 MongoDB 和 Broker 地址区分
+    放在当前用户私有的目录中，其他用户无法伪造；没有可用的私有目录时返回 None
+    """
+    cache_dir = private_cache_dir()
+    if cache_dir is None:
+        return None
+
+    key = "{}|{}".format(config.get('MONGO', {}).get('URI', ''),
+                         config.get('CELERY', {}).get('BROKER_URL', ''))
+    name = hashlib.md5(key.encode()).hexdigest()
+    return os.path.join(cache_dir, "arl_depcheck_{}".format(name))
+
+
+def cached_check_dependencies(config, ttl=DEPENDENCY_CHECK_TTL):
+    """
+    最近 ttl 秒内依赖检查已通过时直接跳过，否则重新检查并更新标记文件
+    
+    Args:
+        config (dict): 配置字典
+        ttl (int): 检查结果有效期（秒）
+    """
+    marker = _dependency_check_marker(config)
+    if marker is None:
+        return check_dependencies_isolated(config)
+
+    try:
+        if time.time() - os.path.getmtime(marker) < ttl:
+            print(f"依赖检查在 {ttl} 秒内已通过，跳过检查")
+            return True
+    except OSError:
+        pass
+
+    ok = check_dependencies_isolated(config)
+    if ok:
+        # 先写临时文件再替换，避免并发启动时读到不完整的标记
+        try:
+            fd, tmp_marker = tempfile.mkstemp(dir=os.path.dirname(marker))
+            os.close(fd)
+            os.replace(tmp_marker, marker)
+        except OSError:
+            pass
+
+    return ok
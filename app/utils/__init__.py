@@ -7,12 +7,15 @@ import os
 import re
 import sys
 import hashlib
+import functools
+import asyncio
+import threading
 from celery.utils.log import get_task_logger
 import colorlog
 import logging
 import dns.resolver
 from tld import get_tld
-from .conn import http_req, conn_db
+from .conn import http_req, conn_db, close_conn_db
 from .http import get_title, get_headers
 from .domain import check_domain_black, is_valid_domain, is_in_scope, is_in_scopes, is_valid_fuzz_domain
 from .ip import is_vaild_ip_target, not_in_black_ips, get_ip_asn, get_ip_city, get_ip_type
@@ -25,6 +28,7 @@ from .cdn import get_cdn_name_by_cname, get_cdn_name_by_ip
 from .device import device_info
 from .cron import check_cron, check_cron_interval
 from .query_loader import load_query_plugins
+from .dns_cache import install_dns_cache
 
 
 def load_file(path):
@@ -145,6 +149,7 @@ def domain_parsed(domain, fail_silently=True):
             raise e
 
 
+@functools.lru_cache(maxsize=32768)
 def get_fld(d):
     """获取域名的主域"""
     res = domain_parsed(d)
@@ -201,6 +206,24 @@ def exit_gracefully(signum, frame):
     parent.kill()
 
 
+def can_run_async_subprocess():
+    """
+    当前线程能否用 asyncio.run 执行异步子进程
+    已有运行中的事件循环时不能嵌套；Python 3.7 的子进程 watcher 只能在主线程中挂载，
+    Flask 请求线程和线程池中的任务需要走线程方式
+    """
+    try:
+        asyncio.get_running_loop()
+        return False
+    except RuntimeError:
+        pass
+
+    if sys.version_info >= (3, 8) or sys.platform == "win32":
+        return True
+
+    return threading.current_thread() is threading.main_thread()
+
+
 def truncate_string(s):
     if len(s) > 30:
         truncated_string = s[:30]
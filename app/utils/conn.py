@@ -79,10 +79,22 @@ class ConnMongo(object):
     def __new__(self):
         if not hasattr(self, 'instance'):
             self.instance = super(ConnMongo, self).__new__(self)
-            self.instance.conn = MongoClient(Config.MONGO_URL)
+            self.instance.conn = MongoClient(Config.MONGO_URL,
+                                             maxPoolSize=Config.MONGO_MAX_POOL_SIZE,
+                                             minPoolSize=Config.MONGO_MIN_POOL_SIZE)
         return self.instance
 
 
+def close_conn_db():
+    """
+    关闭当前进程的 MongoClient，之后调用 conn_db 时重新创建
+    fork 子进程之前调用，避免子进程共用父进程的连接
+    """
+    if hasattr(ConnMongo, 'instance'):
+        ConnMongo.instance.conn.close()
+        del ConnMongo.instance
+
+
 def conn_db(collection, db_name = None):
     conn = ConnMongo().conn
     if db_name:
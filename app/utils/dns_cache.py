@@ -0,0 +1,45 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+
+# 缓存有效期（秒）
+DNS_CACHE_TTL = 15 * 60
+DNS_CACHE_MAX_SIZE = 65536
+
+_origin_getaddrinfo = socket.getaddrinfo
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    """
+    带 TTL 的 LRU getaddrinfo，解析失败的结果不缓存
+    """
+    key = (host, port, family, type, proto, flags)
+    now = time.monotonic()
+    with _lock:
+        item = _cache.get(key)
+        if item is not None and now - item[0] < DNS_CACHE_TTL:
+            _cache.move_to_end(key)
+            return item[1]
+
+    result = _origin_getaddrinfo(host, port, family, type, proto, flags)
+
+    with _lock:
+        _cache[key] = (now, result)
+        _cache.move_to_end(key)
+        while len(_cache) > DNS_CACHE_MAX_SIZE:
+            _cache.popitem(last=False)
+
+    return result
+
+
+def install_dns_cache():
+    """替换 socket.getaddrinfo，整个进程共享同一份 DNS 缓存"""
+    socket.getaddrinfo = cached_getaddrinfo
+
+
+def clear_dns_cache():
+    with _lock:
+        _cache.clear()
@@ -8,82 +8,22 @@ ARL 一键启动脚本
 import os
 import sys
 import argparse
-import yaml
 import subprocess
 import time
 import signal
+import socket
+import threading
+import functools
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import wait
 
 # 添加app目录到Python路径
 current_dir = Path(__file__).parent
 app_dir = current_dir / "app"
 sys.path.insert(0, str(app_dir))
 
-
-def load_config(config_file):
-    """
-    加载配置文件
-    
-    Args:
-        config_file (str): 配置文件路径
-        
-    Returns:
-        dict: 配置字典
-    """
-    try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        return config
-    except Exception as e:
-        print(f"加载配置文件失败: {e}")
-        sys.exit(1)
-
-
-def check_dependencies(config):
-    """
-    检查外部依赖连接
-    
-    Args:
-        config (dict): 配置字典
-    """
-    print("正在检查外部依赖连接...")
-    
-    # 检查MongoDB连接
-    try:
-        from pymongo import MongoClient
-        mongo_uri = config.get('MONGO', {}).get('URI', 'mongodb://localhost:27017/')
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        client.server_info()
-        print("✓ MongoDB连接正常")
-    except Exception as e:
-        print(f"✗ MongoDB连接失败: {e}")
-        print("请确保MongoDB服务已启动并且连接配置正确")
-        return False
-    
-    # 检查RabbitMQ连接
-    try:
-        import pika
-        broker_url = config.get('CELERY', {}).get('BROKER_URL', '')
-        if broker_url.startswith('amqp://'):
-            # 解析RabbitMQ连接参数
-            from urllib.parse import urlparse
-            parsed = urlparse(broker_url)
-            credentials = pika.PlainCredentials(parsed.username, parsed.password)
-            parameters = pika.ConnectionParameters(
-                host=parsed.hostname,
-                port=parsed.port or 5672,
-                virtual_host=parsed.path[1:] if parsed.path else '/',
-                credentials=credentials
-            )
-            connection = pika.BlockingConnection(parameters)
-            connection.close()
-            print("✓ RabbitMQ连接正常")
-    except Exception as e:
-        print(f"✗ RabbitMQ连接失败: {e}")
-        print("请确保RabbitMQ服务已启动并且连接配置正确")
-        return False
-    
-    return True
+from app.startup_checks import load_config, cached_check_dependencies
 
 
 def start_service(script_name, service_name, config_file, extra_args=None):
@@ -107,6 +47,113 @@ def start_service(script_name, service_name, config_file, extra_args=None):
     return subprocess.Popen(cmd)
 
 
+def wait_port_ready(process, host, port, timeout=60):
+    """
+    等待 Web 服务端口可以连接
+
+    Args:
+        process (subprocess.Popen): Web 服务进程
+        host (str): 监听地址
+        port (int): 监听端口
+        timeout (int): 最长等待时间（秒）
+
+    Returns:
+        bool: 是否就绪
+    """
+    if host in ('0.0.0.0', '::', ''):
+        host = '127.0.0.1'
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        try:
+            with socket.create_connection((host, port), timeout=0.1):
+                return True
+        except OSError:
+            time.sleep(0.05)
+
+    return False
+
+
+def wait_worker_ready(process, config_file, timeout=60):
+    """
+    通过 celery inspect ping 等待 Worker 就绪
+
+    Args:
+        process (subprocess.Popen): Worker 进程
+        config_file (str): 配置文件路径
+        timeout (int): 最长等待时间（秒）
+
+    Returns:
+        bool: 是否就绪
+    """
+    cmd = [sys.executable, '-m', 'celery', '-A', 'app.celerytask.celery',
+           'inspect', 'ping', '--timeout', '1']
+    env = dict(os.environ, ARL_CONFIG_FILE=os.path.abspath(config_file))
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        result = subprocess.run(cmd, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, env=env)
+        if result.returncode == 0:
+            return True
+        time.sleep(0.5)
+
+    return False
+
+
+# 子进程退出时由 SIGCHLD 处理函数置位
+_child_exit_event = threading.Event()
+
+
+def process_sentinel(process):
+    """
+    获取可交给 multiprocessing.connection.wait 等待的进程句柄
+
+    Args:
+        process (subprocess.Popen): 进程对象
+
+    Returns:
+        int: Windows 下为进程句柄，Linux 下为 pidfd，不支持时返回 None
+    """
+    if os.name == 'nt':
+        return int(process._handle)
+
+    if hasattr(os, 'pidfd_open'):
+        # Linux 5.3+ / Python 3.9+，进程退出时 pidfd 变为可读
+        try:
+            return os.pidfd_open(process.pid)
+        except OSError:
+            return None
+
+    return None
+
+
+def wait_child_exit(running):
+    """
+    阻塞等待任意子进程退出，不再定时轮询
+
+    Args:
+        running (dict): 仍在运行的 {进程对象: 进程句柄}
+
+    Returns:
+        list: 已退出的进程对象
+    """
+    # 先清除事件再检查，避免漏掉检查之后退出的进程
+    _child_exit_event.clear()
+    exited = [process for process in running if process.poll() is not None]
+    if exited:
+        return exited
+
+    sentinels = [sentinel for sentinel in running.values() if sentinel is not None]
+    if len(sentinels) == len(running):
+        wait(sentinels)
+    else:
+        # 没有可等待的句柄时，收到 SIGCHLD 才被唤醒
+        _child_exit_event.wait()
+
+    return [process for process in running if process.poll() is not None]
+
+
 def main():
     """
     主函数
@@ -160,7 +207,7 @@ def main():
     
     # 检查依赖连接
     if not args.skip_check:
-        if not check_dependencies(config):
+        if not cached_check_dependencies(config):
             print("\n依赖检查失败，请检查外部服务状态")
             print("如果要跳过检查强制启动，请使用 --skip-check 参数")
             sys.exit(1)
@@ -170,6 +217,12 @@ def main():
     print(f"启动服务: {', '.join(args.services)}")
     
     processes = []
+    # 各服务的就绪检查，启动后并行执行
+    ready_checks = []
+
+    if os.name != 'nt':
+        # 子进程退出时唤醒主循环，需要在启动子进程之前注册
+        signal.signal(signal.SIGCHLD, lambda signum, frame: _child_exit_event.set())
     
     try:
         # 启动Worker (如果需要)
@@ -180,13 +233,12 @@ def main():
             
             process = start_service('start_worker.py', 'Worker', args.config, worker_args)
             processes.append(('Worker', process))
-            time.sleep(2)  # 等待Worker启动
+            ready_checks.append(('Worker', functools.partial(wait_worker_ready, process, args.config)))
         
         # 启动Scheduler (如果需要)
         if 'scheduler' in args.services:
             process = start_service('start_scheduler.py', 'Scheduler', args.config)
             processes.append(('Scheduler', process))
-            time.sleep(2)  # 等待Scheduler启动
         
         # 启动Web服务 (如果需要)
         if 'web' in args.services:
@@ -198,6 +250,19 @@ def main():
             
             process = start_service('start_web.py', 'Web服务', args.config, web_args)
             processes.append(('Web服务', process))
+
+            web_config = config.get('WEB', {}) or {}
+            web_host = args.web_host or web_config.get('HOST', '0.0.0.0')
+            web_port = args.web_port or web_config.get('PORT', 5003)
+            ready_checks.append(('Web服务', functools.partial(wait_port_ready, process, web_host, int(web_port))))
+
+        # 并行等待各服务就绪，总耗时取决于最慢的服务
+        if ready_checks:
+            with ThreadPoolExecutor(max_workers=len(ready_checks)) as executor:
+                futures = [(name, executor.submit(check)) for name, check in ready_checks]
+                for name, future in futures:
+                    if not future.result():
+                        print(f"警告: {name} 未在预期时间内就绪")
         
         print(f"\n所有服务已启动，共 {len(processes)} 个进程")
         print("服务状态:")
@@ -208,12 +273,14 @@ def main():
         print("\n按 Ctrl+C 停止所有服务")
         
         # 等待所有进程
-        while True:
-            time.sleep(1)
-            # 检查进程状态
-            for name, process in processes:
-                if process.poll() is not None:
-                    print(f"\n警告: {name} 进程已退出 (退出码: {process.returncode})")
+        names = {process: name for name, process in processes}
+        running = {process: process_sentinel(process) for _, process in processes}
+        while running:
+            for process in wait_child_exit(running):
+                print(f"\n警告: {names[process]} 进程已退出 (退出码: {process.returncode})")
+                sentinel = running.pop(process)
+                if sentinel is not None and os.name != 'nt':
+                    os.close(sentinel)
             
     except KeyboardInterrupt:
         print("\n正在停止所有服务...")
@@ -5,10 +5,10 @@ ARL Web服务独立启动脚本
 用于独立部署模式下启动Web服务
 """
 
+import gc
 import os
 import sys
 import argparse
-import yaml
 from pathlib import Path
 
 # 添加app目录到Python路径
@@ -16,74 +16,10 @@ current_dir = Path(__file__).parent
 app_dir = current_dir / "app"
 sys.path.insert(0, str(app_dir))
 
-from app.main import arl_app
-from app.utils import arl_update
+from app.startup_checks import load_config, cached_check_dependencies, check_dependencies_isolated
 
-
-def load_config(config_file):
-    """
-    加载配置文件
-    
-    Args:
-        config_file (str): 配置文件路径
-        
-    Returns:
-        dict: 配置字典
-    """
-    try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        return config
-    except Exception as e:
-        print(f"加载配置文件失败: {e}")
-        sys.exit(1)
-
-
-def check_dependencies(config):
-    """
-    检查外部依赖连接
-    
-    Args:
-        config (dict): 配置字典
-    """
-    print("正在检查外部依赖连接...")
-    
-    # 检查MongoDB连接
-    try:
-        from pymongo import MongoClient
-        mongo_uri = config.get('MONGO', {}).get('URI', 'mongodb://localhost:27017/')
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        client.server_info()
-        print("✓ MongoDB连接正常")
-    except Exception as e:
-        print(f"✗ MongoDB连接失败: {e}")
-        print("请确保MongoDB服务已启动并且连接配置正确")
-        return False
-    
-    # 检查RabbitMQ连接
-    try:
-        import pika
-        broker_url = config.get('CELERY', {}).get('BROKER_URL', '')
-        if broker_url.startswith('amqp://'):
-            # 解析RabbitMQ连接参数
-            from urllib.parse import urlparse
-            parsed = urlparse(broker_url)
-            credentials = pika.PlainCredentials(parsed.username, parsed.password)
-            parameters = pika.ConnectionParameters(
-                host=parsed.hostname,
-                port=parsed.port or 5672,
-                virtual_host=parsed.path[1:] if parsed.path else '/',
-                credentials=credentials
-            )
-            connection = pika.BlockingConnection(parameters)
-            connection.close()
-            print("✓ RabbitMQ连接正常")
-    except Exception as e:
-        print(f"✗ RabbitMQ连接失败: {e}")
-        print("请确保RabbitMQ服务已启动并且连接配置正确")
-        return False
-    
-    return True
+# 默认的精简访问日志格式
+ACCESS_LOG_FORMAT = '%({x-real-ip}i)s %(t)s "%(r)s" %(s)s %(b)s'
 
 
 def main():
@@ -117,6 +53,11 @@ def main():
         action='store_true',
         help='跳过依赖检查'
     )
+    parser.add_argument(
+        '--force-check',
+        action='store_true',
+        help='忽略最近的检查结果，强制检查依赖'
+    )
     
     args = parser.parse_args()
     
@@ -134,7 +75,11 @@ def main():
     
     # 检查依赖连接
     if not args.skip_check:
-        if not check_dependencies(config):
+        if args.force_check:
+            ok = check_dependencies_isolated(config)
+        else:
+            ok = cached_check_dependencies(config)
+        if not ok:
             print("\n依赖检查失败，请检查外部服务状态")
             print("如果要跳过检查强制启动，请使用 --skip-check 参数")
             sys.exit(1)
@@ -150,6 +95,10 @@ def main():
     print(f"调试模式: {debug}")
     print(f"配置文件: {args.config}")
     
+    # 依赖检查通过后再加载 Web 应用，--help 和检查失败时无需导入
+    from app.main import arl_app
+    from app.utils import arl_update
+    
     # 执行更新检查
     try:
         arl_update()
@@ -164,14 +113,44 @@ def main():
             # 生产模式使用gunicorn
             try:
                 import gunicorn.app.wsgiapp as wsgi
+                # 接口以 MongoDB 查询等 I/O 为主，默认使用 gthread 线程 worker
+                worker_class = web_config.get('WORKER_CLASS', 'gthread')
+                # 进程数优先取环境变量，其次配置文件，都未设置时按 CPU 核数计算
+                workers = os.environ.get('GUNICORN_WORKERS') or web_config.get('WORKERS') \
+                    or (os.cpu_count() or 1) * 2 + 1
+                threads = web_config.get('THREADS', 8)
                 sys.argv = [
                     'gunicorn',
+                    '--config', 'python:app.gunicorn_conf',
                     '--bind', f'{host}:{port}',
-                    '--workers', '3',
-                    '--access-logfile', 'arl_web.log',
-                    '--access-logformat', '%({x-real-ip}i)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"',
-                    'app.main:arl_app'
+                    '--workers', str(workers),
+                    '--worker-class', worker_class,
+                    '--threads', str(threads),
                 ]
+                # 访问日志默认输出到标准输出，可配置为文件路径，格式配置为 none 时不记录
+                access_log_format = web_config.get('ACCESS_LOG_FORMAT') or ACCESS_LOG_FORMAT
+                if access_log_format != 'none':
+                    sys.argv.extend([
+                        '--access-logfile', web_config.get('ACCESS_LOG') or '-',
+                        '--access-logformat', access_log_format
+                    ])
+                # 在 master 中导入应用后再 fork，worker 通过写时复制共享代码和常量
+                if web_config.get('PRELOAD', True):
+                    sys.argv.append('--preload')
+                # 多个 Gunicorn 实例监听同一端口，由内核分配连接
+                if web_config.get('REUSE_PORT', False):
+                    sys.argv.append('--reuse-port')
+                # 可选的超时和 worker 回收配置
+                for key, option in [('TIMEOUT', '--timeout'),
+                                    ('KEEP_ALIVE', '--keep-alive'),
+                                    ('MAX_REQUESTS', '--max-requests'),
+                                    ('MAX_REQUESTS_JITTER', '--max-requests-jitter')]:
+                    if web_config.get(key):
+                        sys.argv.extend([option, str(web_config[key])])
+                sys.argv.append('app.main:arl_app')
+                # 将启动阶段创建的对象移出 GC 跟踪，避免 worker 中的垃圾回收写脏共享页
+                if hasattr(gc, 'freeze'):
+                    gc.freeze()
                 wsgi.run()
             except ImportError:
                 print("gunicorn未安装，使用Flask开发服务器")
@@ -8,91 +8,106 @@ ARL Worker服务独立启动脚本
 import os
 import sys
 import argparse
-import yaml
+import signal
+import socket
 import subprocess
 from pathlib import Path
+from urllib.parse import urlparse
 
 # 添加app目录到Python路径
 current_dir = Path(__file__).parent
 app_dir = current_dir / "app"
 sys.path.insert(0, str(app_dir))
 
+from app.config_cache import private_cache_dir
+from app.startup_checks import load_config, cached_check_dependencies, check_dependencies_isolated
 
-def load_config(config_file):
+
+# 各类连接地址未指定端口时的默认端口
+DEFAULT_PORTS = {
+    'amqp': 5672,
+    'amqps': 5671,
+    'redis': 6379,
+    'rediss': 6379,
+    'mongodb': 27017,
+}
+
+
+def _tcp_reachable(url, timeout=0.5):
     """
-    加载配置文件
+    检查连接地址中的任一主机端口是否可以建立 TCP 连接
     
     Args:
-        config_file (str): 配置文件路径
+        url (str): amqp:// redis:// mongodb:// 等连接地址
+        timeout (float): 连接超时时间（秒）
         
     Returns:
-        dict: 配置字典
+        bool: 是否可达，无法解析的地址视为可达，交给后续逻辑处理
     """
-    try:
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
-        return config
-    except Exception as e:
-        print(f"加载配置文件失败: {e}")
-        sys.exit(1)
+    parsed = urlparse(url)
+    default_port = DEFAULT_PORTS.get(parsed.scheme)
+    if default_port is None:
+        return True
 
+    # mongodb 支持逗号分隔的多个主机
+    hosts = parsed.netloc.rsplit('@', 1)[-1].split(',')
+    for host in hosts:
+        try:
+            item = urlparse('//' + host)
+            address = (item.hostname, item.port or default_port)
+        except ValueError:
+            continue
 
-def check_dependencies(config):
+        if not item.hostname:
+            continue
+
+        try:
+            with socket.create_connection(address, timeout=timeout):
+                return True
+        except OSError:
+            continue
+
+    return False
+
+
+def tcp_precheck(config):
     """
-    检查外部依赖连接
+    快速检查 Broker 和 MongoDB 端口是否可以连接，--skip-check 时同样执行，
+    避免依赖不可用时 Celery 长时间重试
     
     Args:
         config (dict): 配置字典
+        
+    Returns:
+        bool: 是否都可以连接
     """
-    print("正在检查外部依赖连接...")
-    
-    # 检查MongoDB连接
-    try:
-        from pymongo import MongoClient
-        mongo_uri = config.get('MONGO', {}).get('URI', 'mongodb://localhost:27017/')
-        client = MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
-        client.server_info()
-        print("✓ MongoDB连接正常")
-    except Exception as e:
-        print(f"✗ MongoDB连接失败: {e}")
-        print("请确保MongoDB服务已启动并且连接配置正确")
-        return False
-    
-    # 检查RabbitMQ连接
-    try:
-        import pika
-        broker_url = config.get('CELERY', {}).get('BROKER_URL', '')
-        if broker_url.startswith('amqp://'):
-            # 解析RabbitMQ连接参数
-            from urllib.parse import urlparse
-            parsed = urlparse(broker_url)
-            credentials = pika.PlainCredentials(parsed.username, parsed.password)
-            parameters = pika.ConnectionParameters(
-                host=parsed.hostname,
-                port=parsed.port or 5672,
-                virtual_host=parsed.path[1:] if parsed.path else '/',
-                credentials=credentials
-            )
-            connection = pika.BlockingConnection(parameters)
-            connection.close()
-            print("✓ RabbitMQ连接正常")
-    except Exception as e:
-        print(f"✗ RabbitMQ连接失败: {e}")
-        print("请确保RabbitMQ服务已启动并且连接配置正确")
-        return False
-    
-    return True
+    targets = [
+        ('RabbitMQ', config.get('CELERY', {}).get('BROKER_URL', '')),
+        ('MongoDB', config.get('MONGO', {}).get('URI', 'mongodb://localhost:27017/')),
+    ]
+
+    ok = True
+    for name, url in targets:
+        if url and not _tcp_reachable(url):
+            print(f"✗ {name}端口无法连接: {urlparse(url).hostname}")
+            ok = False
 
+    return ok
 
-def start_worker(queue_name, worker_name, concurrency, log_file):
+
+def build_worker_cmd(queue_name, worker_name, concurrency, log_file, pool='prefork'):
     """
-    启动单个Worker进程
+    构建Worker启动命令
     
     Args:
         queue_name (str): 队列名称
         worker_name (str): Worker名称
         concurrency (int): 并发数
         log_file (str): 日志文件路径
+        pool (str): Celery 进程池类型
+        
+    Returns:
+        list: 命令参数列表
     """
     cmd = [
         sys.executable, '-m', 'celery',
@@ -102,14 +117,119 @@ def start_worker(queue_name, worker_name, concurrency, log_file):
         '-Q', queue_name,
         '-n', worker_name,
         '-c', str(concurrency),
-        '-O', 'fair',
-        '-f', log_file
+        '--pool', pool,
+        '-O', 'fair'
     ]
+
+    # 日志文件为 - 时不指定 -f，Celery 默认输出到标准错误
+    if log_file != '-':
+        cmd.extend(['-f', log_file])
+
+    return cmd
+
+
+def start_worker(queue_name, worker_name, concurrency, log_file, pool='prefork'):
+    """
+    启动单个Worker进程
+    
+    Args:
+        queue_name (str): 队列名称
+        worker_name (str): Worker名称
+        concurrency (int): 并发数
+        log_file (str): 日志文件路径
+        pool (str): Celery 进程池类型
+    """
+    cmd = build_worker_cmd(queue_name, worker_name, concurrency, log_file, pool)
     
     print(f"启动Worker: {worker_name} (队列: {queue_name}, 并发: {concurrency})")
     return subprocess.Popen(cmd)
 
 
+def exec_worker(queue_name, worker_name, concurrency, log_file, pool='prefork'):
+    """
+    用Worker进程替换当前进程，不再保留启动脚本进程，Ctrl+C 直接交给 Celery 处理
+    
+    Args:
+        queue_name (str): 队列名称
+        worker_name (str): Worker名称
+        concurrency (int): 并发数
+        log_file (str): 日志文件路径
+        pool (str): Celery 进程池类型
+    """
+    cmd = build_worker_cmd(queue_name, worker_name, concurrency, log_file, pool)
+    
+    print(f"启动Worker: {worker_name} (队列: {queue_name}, 并发: {concurrency})")
+    sys.stdout.flush()
+    os.execv(cmd[0], cmd)
+
+
+def build_multi_cmd(action, queues, concurrency, log_file, pool='prefork'):
+    """
+    构建 celery multi 命令，每个队列对应一个同名节点
+    
+    Args:
+        action (str): start / stopwait 等 celery multi 子命令
+        queues (list): 队列名称列表
+        concurrency (int): 并发数
+        log_file (str): 日志文件路径，每个节点写入各自的日志文件
+        pool (str): Celery 进程池类型
+        
+    Returns:
+        list: 命令参数列表
+    """
+    cmd = [sys.executable, '-m', 'celery', '-A', 'app.celerytask.celery', 'multi', action]
+    cmd.extend(queues)
+    for queue in queues:
+        cmd.extend([f'-Q:{queue}', queue])
+
+    # 后台运行的节点不能输出到终端，日志文件为 - 时使用默认文件名
+    if log_file == '-':
+        log_file = 'arl_worker.log'
+    root, ext = os.path.splitext(log_file)
+    # pid 文件放在当前用户私有的目录中，不可用时放到日志文件所在目录
+    pid_dir = private_cache_dir() or os.path.dirname(os.path.abspath(log_file))
+    pid_file = os.path.join(pid_dir, 'arl_worker_%n.pid')
+
+    cmd.extend([
+        '-l', 'info',
+        '-c', str(concurrency),
+        '--pool', pool,
+        '-O', 'fair',
+        f'--pidfile={pid_file}',
+        f'--logfile={root}_%n{ext}'
+    ])
+    return cmd
+
+
+def run_multi_workers(queues, concurrency, log_file, pool='prefork'):
+    """
+    由 celery multi 在后台启动并管理多个Worker，收到 Ctrl+C 或 SIGTERM 后通过 stopwait 停止
+    
+    Args:
+        queues (list): 队列名称列表
+        concurrency (int): 并发数
+        log_file (str): 日志文件路径
+        pool (str): Celery 进程池类型
+    """
+    print(f"启动Worker: {', '.join(queues)} (并发: {concurrency})")
+    result = subprocess.run(build_multi_cmd('start', queues, concurrency, log_file, pool))
+    if result.returncode != 0:
+        print("启动失败: celery multi start 返回码 {}".format(result.returncode))
+        sys.exit(1)
+
+    print(f"\n所有Worker已启动，共 {len(queues)} 个节点")
+    print("按 Ctrl+C 停止所有Worker")
+
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        while True:
+            signal.pause()
+    except KeyboardInterrupt:
+        print("\n正在停止所有Worker...")
+        subprocess.run(build_multi_cmd('stopwait', queues, concurrency, log_file, pool))
+        print("所有Worker已停止")
+
+
 def main():
     """
     主函数
@@ -135,13 +255,23 @@ def main():
     parser.add_argument(
         '--log-file',
         default='arl_worker.log',
-        help='日志文件路径 (默认: arl_worker.log)'
+        help='日志文件路径，- 表示输出到标准错误 (默认: arl_worker.log)'
     )
     parser.add_argument(
         '--skip-check',
         action='store_true',
         help='跳过依赖检查'
     )
+    parser.add_argument(
+        '--force-check',
+        action='store_true',
+        help='忽略最近的检查结果，强制检查依赖'
+    )
+    parser.add_argument(
+        '--isolate-queues',
+        action='store_true',
+        help='每个队列启动独立的Worker进程 (默认: 所有队列共用一个Worker)'
+    )
     
     args = parser.parse_args()
     
@@ -159,33 +289,57 @@ def main():
     
     # 检查依赖连接
     if not args.skip_check:
-        if not check_dependencies(config):
+        if args.force_check:
+            ok = check_dependencies_isolated(config)
+        else:
+            ok = cached_check_dependencies(config)
+        if not ok:
             print("\n依赖检查失败，请检查外部服务状态")
             print("如果要跳过检查强制启动，请使用 --skip-check 参数")
             sys.exit(1)
+
+    # 无论是否跳过依赖检查，都先快速检查端口，依赖不可用时立即退出
+    if not tcp_precheck(config):
+        print("\n外部服务端口无法连接，请检查外部服务状态")
+        sys.exit(2)
     
     # 获取Worker配置
     worker_config = config.get('WORKER', {})
-    concurrency = args.concurrency or worker_config.get('CONCURRENCY', 2)
+    pool = worker_config.get('POOL', 'prefork')
+    # 协程池的并发数是协程数量，未指定时使用更大的默认值
+    default_concurrency = 200 if pool in ('gevent', 'eventlet') else 2
+    concurrency = args.concurrency or worker_config.get('CONCURRENCY') or default_concurrency
     queues = worker_config.get('QUEUES', ['arltask', 'arlgithub'])
     
     print(f"\n正在启动ARL Worker服务...")
     print(f"配置文件: {args.config}")
     print(f"日志文件: {args.log_file}")
     
+    if args.queue != 'all':
+        queues = [args.queue]
+
+    # 只需要一个Worker时直接执行，Windows 下 exec 不能替换当前进程，仍使用子进程方式
+    if os.name != 'nt' and (len(queues) == 1 or not args.isolate_queues):
+        worker_name = queues[0] if len(queues) == 1 else 'arl@%h'
+        exec_worker(','.join(queues), worker_name, concurrency, args.log_file, pool)
+
+    if os.name != 'nt':
+        run_multi_workers(queues, concurrency, args.log_file, pool)
+        return
+    
+    # Windows 下不支持 celery multi，由当前进程管理各个Worker子进程
     processes = []
     
     try:
-        if args.queue == 'all':
-            # 启动所有队列的Worker
+        if args.isolate_queues or len(queues) == 1:
+            # 每个队列启动独立的Worker，便于按队列隔离资源
             for queue in queues:
                 worker_name = queue
-                process = start_worker(queue, worker_name, concurrency, args.log_file)
+                process = start_worker(queue, worker_name, concurrency, args.log_file, pool)
                 processes.append(process)
         else:
-            # 启动指定队列的Worker
-            worker_name = args.queue
-            process = start_worker(args.queue, worker_name, concurrency, args.log_file)
+            # 一个Worker同时消费所有队列，共用一个进程池和Broker连接
+            process = start_worker(','.join(queues), 'arl@%h', concurrency, args.log_file, pool)
             processes.append(process)
         
         print(f"\n所有Worker已启动，共 {len(processes)} 个进程")